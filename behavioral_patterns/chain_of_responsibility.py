@@ -14,11 +14,19 @@ for resolution.
 Solution with the Chain of Responsibility Pattern:
 """
 
+import itertools
+import queue
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod
 
 
 # Abstract Handler
 class SupportTeam(ABC):
+    # Request types this team handles; teams that decide by predicate leave this empty and override can_handle
+    request_types = ()
+
     def __init__(self, name):
         self.name = name
         self.next_team = None
@@ -26,6 +34,9 @@ class SupportTeam(ABC):
     def set_next_team(self, next_team):
         self.next_team = next_team
 
+    def can_handle(self, request):
+        return request.type in self.request_types
+
     @abstractmethod
     def handle_request(self, request):
         pass
@@ -33,33 +44,218 @@ class SupportTeam(ABC):
 
 # Concrete Handlers
 class HardwareTeam(SupportTeam):
+    request_types = ("Hardware",)
+
     def handle_request(self, request):
-        if request.type == "Hardware":
+        if self.can_handle(request):
             print(f"{self.name} team is handling a hardware issue.")
         elif self.next_team:
             self.next_team.handle_request(request)
 
 
 class SoftwareTeam(SupportTeam):
+    request_types = ("Software",)
+
     def handle_request(self, request):
-        if request.type == "Software":
+        if self.can_handle(request):
             print(f"{self.name} team is handling a software problem.")
         elif self.next_team:
             self.next_team.handle_request(request)
 
 
 class NetworkTeam(SupportTeam):
+    request_types = ("Network",)
+
     def handle_request(self, request):
-        if request.type == "Network":
+        if self.can_handle(request):
             print(f"{self.name} team is handling a network-related query.")
         elif self.next_team:
             self.next_team.handle_request(request)
 
 
+class CompiledChain:
+    """
+    Routes requests without walking the chain. Teams that declare request_types go into a type -> team dispatch
+    table; earlier teams win, as they would in the linked list. The remaining teams are predicate teams, checked in
+    chain order and iteratively, so long chains do not recurse. A predicate team is only consulted if it sits before
+    the table's team in the chain, so the result is always the team the linked list would have reached first.
+    A team that neither declares request_types nor overrides can_handle decides inside handle_request, so it takes
+    every request that reaches it and forwards the rest down its own chain.
+    """
+
+    def __init__(self, first_team):
+        self.dispatch_table = {}
+        self.predicate_teams = []
+        self.positions = {}
+        team = first_team
+        while team is not None:
+            self.positions[team] = len(self.positions)
+            if team.request_types:
+                for request_type in team.request_types:
+                    self.dispatch_table.setdefault(request_type, team)
+            else:
+                self.predicate_teams.append(team)
+            team = team.next_team
+
+    @staticmethod
+    def _takes(team, request):
+        if type(team).can_handle is SupportTeam.can_handle and not team.request_types:
+            return True
+        return team.can_handle(request)
+
+    def route(self, request):
+        team = self.dispatch_table.get(request.type)
+        position = self.positions[team] if team is not None else len(self.positions)
+        for predicate_team in self.predicate_teams:
+            if self.positions[predicate_team] > position:
+                break
+            if self._takes(predicate_team, request):
+                return predicate_team
+        return team
+
+    def handle_request(self, request):
+        team = self.route(request)
+        if team is not None:
+            # The team handles the request itself, so no further hops are taken
+            team.handle_request(request)
+
+
 # Request class
 class Request:
-    def __init__(self, req_type):
+    def __init__(self, req_type, priority=0):
         self.type = req_type
+        # Lower values are handled first
+        self.priority = priority
+
+
+class TeamMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.handled = 0
+        self.failed = 0
+        self.total_time_to_handle = 0.0
+        self.max_time_to_handle = 0.0
+
+    def record(self, time_to_handle):
+        with self.lock:
+            self.handled += 1
+            self.total_time_to_handle += time_to_handle
+            self.max_time_to_handle = max(self.max_time_to_handle, time_to_handle)
+
+    def record_failure(self):
+        with self.lock:
+            self.failed += 1
+
+
+class TicketRoutingService:
+    """
+    Routes each ticket once, at ingestion, through a CompiledChain and puts it on the owning team's bounded priority
+    queue. Every team has its own pool of worker threads, so a burst for one team does not hold up the others.
+    """
+    _STOP = float("inf")
+
+    def __init__(self, first_team, workers_per_team=2, queue_size=1000):
+        self.chain = CompiledChain(first_team)
+        teams = list(self.chain.dispatch_table.values()) + self.chain.predicate_teams
+        self.teams = list(dict.fromkeys(teams))
+        self.queues = {team: queue.PriorityQueue(maxsize=queue_size) for team in self.teams}
+        self.metrics = {team: TeamMetrics() for team in self.teams}
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.unrouted = 0
+        self.workers = {}
+        for team in self.teams:
+            concurrency = workers_per_team.get(team.name, 1) if isinstance(workers_per_team, dict) else workers_per_team
+            self.workers[team] = [threading.Thread(target=self._work, args=(team,), daemon=True)
+                                  for _ in range(concurrency)]
+            for worker in self.workers[team]:
+                worker.start()
+
+    def submit(self, request, timeout=None):
+        team = self.chain.route(request)
+        if team is None:
+            with self.lock:
+                self.unrouted += 1
+            return False
+        # The sequence number keeps equal priorities in arrival order
+        self.queues[team].put((request.priority, next(self.sequence), time.perf_counter(), request), timeout=timeout)
+        return True
+
+    def _work(self, team):
+        team_queue = self.queues[team]
+        while True:
+            priority, _, enqueued_at, request = team_queue.get()
+            try:
+                if priority == self._STOP:
+                    return
+                team.handle_request(request)
+                self.metrics[team].record(time.perf_counter() - enqueued_at)
+            except Exception:
+                # A failing ticket is counted and the worker moves on to the next one
+                self.metrics[team].record_failure()
+            finally:
+                team_queue.task_done()
+
+    def join(self):
+        for team_queue in self.queues.values():
+            team_queue.join()
+
+    def shutdown(self):
+        # One stop marker per worker; it sorts after every real ticket, so queued tickets are handled first
+        for team, workers in self.workers.items():
+            for _ in workers:
+                self.queues[team].put((self._STOP, next(self.sequence), 0.0, None))
+        for workers in self.workers.values():
+            for worker in workers:
+                worker.join()
+
+    def report(self):
+        report = {}
+        for team in self.teams:
+            metrics = self.metrics[team]
+            report[team.name] = {
+                "queue_depth": self.queues[team].qsize(),
+                "handled": metrics.handled,
+                "failed": metrics.failed,
+                "avg_time_to_handle": metrics.total_time_to_handle / metrics.handled if metrics.handled else 0.0,
+                "max_time_to_handle": metrics.max_time_to_handle,
+            }
+        return report
+
+
+def benchmark_routing(chain_lengths=(3, 10, 100, 1000), requests_per_run=10_000):
+    class NumberedTeam(SupportTeam):
+        def handle_request(self, request):
+            if request.type in self.request_types:
+                self.handled += 1
+            elif self.next_team:
+                self.next_team.handle_request(request)
+
+    # The linked chain recurses once per hop
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 2 * max(chain_lengths) + 100))
+    for length in chain_lengths:
+        teams = []
+        for index in range(length):
+            team = NumberedTeam(f"Team {index}")
+            team.request_types = (f"Type {index}",)
+            team.handled = 0
+            if teams:
+                teams[-1].set_next_team(team)
+            teams.append(team)
+        # Worst case for the linked list: every request goes to the last team
+        request = Request(f"Type {length - 1}")
+
+        start = time.perf_counter()
+        for _ in range(requests_per_run):
+            teams[0].handle_request(request)
+        walked = time.perf_counter() - start
+
+        chain = CompiledChain(teams[0])
+        start = time.perf_counter()
+        for _ in range(requests_per_run):
+            chain.handle_request(request)
+        compiled = time.perf_counter() - start
+        print(f"{length} teams: linked chain {walked:.3f}s, dispatch table {compiled:.3f}s")
 
 
 # Client code
@@ -81,3 +277,19 @@ if __name__ == "__main__":
     hardware_team.handle_request(request1)
     hardware_team.handle_request(request2)
     hardware_team.handle_request(request3)
+
+    # Same routing through a compiled dispatch table
+    chain = CompiledChain(hardware_team)
+    for request in (request1, request2, request3):
+        chain.handle_request(request)
+
+    # A burst of tickets handled by per-team worker pools
+    service = TicketRoutingService(hardware_team, workers_per_team={"Hardware": 2, "Software": 1, "Network": 1})
+    for index in range(6):
+        service.submit(Request(("Hardware", "Software", "Network")[index % 3], priority=index % 2))
+    service.join()
+    print(service.report())
+    service.shutdown()
+
+    if '--benchmark' in sys.argv:
+        benchmark_routing()
@@ -12,6 +12,8 @@ However, the remote control should also support undoing the last action.
 """
 
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 
 # Receiver: Represents a smart device (e.g., light, thermostat, door)
@@ -42,6 +44,8 @@ class Command(ABC):
 
 # Concrete Commands
 class TurnOnCommand(Command):
+    target_state = "ON"
+
     def __init__(self, device):
         self.device = device
 
@@ -53,6 +57,8 @@ class TurnOnCommand(Command):
 
 
 class TurnOffCommand(Command):
+    target_state = "OFF"
+
     def __init__(self, device):
         self.device = device
 
@@ -65,17 +71,173 @@ class TurnOffCommand(Command):
 
 # Invoker: Remote control
 class RemoteControl:
-    def __init__(self):
-        self.command_history = []
+    """
+    Keeps the last history_size entries in a ring buffer as flat (sequence, command, previous state) records; a
+    committed batch is one record holding a tuple of commands and a tuple of previous states. sequence is the entry's
+    absolute position in the history (1 for the first applied entry), so undo_to(N) means the same point in history
+    even after the ring buffer has dropped its oldest entries. Undo and redo go through the commands themselves (undo()
+    and execute()). The previous state is the device state before a command that changed a stateful device, and None
+    otherwise. undo_to uses them to set every device touched after the target straight back to the state it had
+    before its first change there, changing each device at most once; if any entry after the target has a None,
+    undo_to undoes the entries one at a time instead.
+
+    Between begin_batch() and commit_batch() pressed buttons are queued instead of executed. On commit, among commands
+    that declare a target_state, only the last one per device is kept and those that would not change the device are
+    dropped; everything left runs concurrently across devices, in queue order on each device. If some commands fail,
+    the ones that completed are still recorded as the batch entry before the first error is re-raised.
+    """
+
+    def __init__(self, history_size=1000, max_workers=4):
+        self.command_history = deque(maxlen=history_size)
+        self.redo_stack = []
+        self.sequence = 0
+        self.max_workers = max_workers
+        self.batch = None
+        self.batch_stats = {"queued": 0, "executed": 0, "saved": 0}
+
+    @staticmethod
+    def _stateful_device(command):
+        device = getattr(command, "device", None)
+        return device if hasattr(device, "state") else None
+
+    @staticmethod
+    def _apply_state(device, state):
+        if device.state != state:
+            if state == "ON":
+                device.turn_on()
+            else:
+                device.turn_off()
+
+    @staticmethod
+    def _execute_in_order(commands):
+        # Stops at the first failure; returns the commands that completed and the error, if any
+        completed = []
+        for command in commands:
+            try:
+                command.execute()
+            except Exception as error:
+                return completed, error
+            completed.append(command)
+        return completed, None
+
+    def _execute_concurrently(self, commands):
+        # One task per device runs that device's commands in queue order; different devices run in parallel
+        per_device = {}
+        for command in commands:
+            device = getattr(command, "device", None)
+            per_device.setdefault(command if device is None else device, []).append(command)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            outcomes = list(executor.map(self._execute_in_order, per_device.values()))
+        done = {id(command) for completed, _ in outcomes for command in completed}
+        completed = [command for command in commands if id(command) in done]
+        return completed, next((error for _, error in outcomes if error is not None), None)
+
+    def _run(self, commands, run):
+        # Runs the commands and records the ones that completed
+        before = [(command, self._stateful_device(command)) for command in commands]
+        before = [(command, device, device.state if device is not None else None) for command, device in before]
+        completed, error = run(commands)
+        if completed:
+            done = set(map(id, completed))
+            previous_states = tuple(previous_state if device is not None and device.state != previous_state else None
+                                    for command, device, previous_state in before if id(command) in done)
+            if len(completed) == 1:
+                self._record(completed[0], previous_states[0])
+            else:
+                self._record(tuple(completed), previous_states)
+        return completed, error
+
+    def _record(self, commands, previous_states):
+        self.sequence += 1
+        self.command_history.append((self.sequence, commands, previous_states))
+
+    @staticmethod
+    def _entries(record):
+        # (command, previous state) pairs of a single press or a batch record
+        _, commands, previous_states = record
+        if isinstance(commands, tuple):
+            return zip(commands, previous_states)
+        return ((commands, previous_states),)
 
     def press_button(self, command):
-        command.execute()
-        self.command_history.append(command)
+        if self.batch is not None:
+            self.batch.append(command)
+            return
+        _, error = self._run((command,), self._execute_in_order)
+        if error is not None:
+            raise error
+        self.redo_stack.clear()
+
+    def begin_batch(self):
+        # Opening a batch while one is already open keeps the commands queued so far
+        if self.batch is None:
+            self.batch = []
+
+    def commit_batch(self):
+        commands, self.batch = self.batch or [], None
+        final_commands = {}
+        for command in commands:
+            # Only commands with a target_state on a stateful device can be folded into the last one for that device
+            device = self._stateful_device(command)
+            target_state = getattr(command, "target_state", None)
+            key = device if device is not None and target_state is not None else command
+            final_commands.pop(key, None)
+            final_commands[key] = command
+        to_execute = tuple(command for key, command in final_commands.items()
+                           if key is command or key.state != command.target_state)
+
+        # Commands that completed are recorded as one entry even if another one in the batch failed
+        completed, error = self._run(to_execute, self._execute_concurrently) if to_execute else ([], None)
+        if completed:
+            self.redo_stack.clear()
+
+        saved = len(commands) - len(to_execute)
+        self.batch_stats["queued"] += len(commands)
+        self.batch_stats["executed"] += len(completed)
+        self.batch_stats["saved"] += saved
+        if error is not None:
+            raise error
+        return {"queued": len(commands), "executed": len(completed), "saved": saved}
 
     def undo_last_command(self):
         if self.command_history:
-            last_command = self.command_history.pop()
-            last_command.undo()
+            record = self.command_history.pop()
+            for command, _ in reversed(list(self._entries(record))):
+                command.undo()
+            self.sequence = record[0] - 1
+            self.redo_stack.append(record)
+
+    def redo(self):
+        if self.redo_stack:
+            commands = [command for command, _ in self._entries(self.redo_stack.pop())]
+            _, error = self._run(commands, self._execute_in_order)
+            if error is not None:
+                raise error
+
+    def undo_to(self, position):
+        # Keeps the first `position` entries of the whole history applied; positions older than the retained
+        # window can no longer be reached
+        if not self.command_history or not self.command_history[0][0] - 1 <= position < self.sequence:
+            return
+        records = [record for record in self.command_history if record[0] > position]
+        entries = [entry for record in records for entry in self._entries(record)]
+        if any(previous_state is None for _, previous_state in entries):
+            # Some command has no device state to rebuild from, or left its device unchanged so that only its own
+            # undo() knows what undoing it means; each entry is then undone through its commands
+            for _ in records:
+                self.undo_last_command()
+            return
+
+        # Entries up to the target stay applied, so only the devices touched after it need to change
+        states = {}
+        for command, previous_state in entries:
+            states.setdefault(command.device, previous_state)
+
+        for device, state in states.items():
+            self._apply_state(device, state)
+        for _ in records:
+            self.redo_stack.append(self.command_history.pop())
+        self.sequence = position
 
 
 if __name__ == "__main__":
@@ -101,3 +263,21 @@ if __name__ == "__main__":
 
     # Undo the last command
     remote.undo_last_command()
+    remote.redo()
+
+    # Jump back to the state after the first command
+    remote.undo_to(1)
+    print(light.state, thermostat.state, door.state)
+
+    # on/off/on on the same device in one batch reaches the device once
+    remote.begin_batch()
+    remote.press_button(TurnOnCommand(door))
+    remote.press_button(TurnOffCommand(door))
+    remote.press_button(TurnOnCommand(door))
+    remote.press_button(TurnOnCommand(thermostat))
+    remote.press_button(TurnOnCommand(light))
+    print(remote.commit_batch())
+
+    # The whole batch is undone as one unit
+    remote.undo_last_command()
+    print(light.state, thermostat.state, door.state, remote.batch_stats)
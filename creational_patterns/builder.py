@@ -1,3 +1,7 @@
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from abc import ABC, abstractmethod
 from abstract_factory import LogisticFactory
 
@@ -41,13 +45,31 @@ class CheckoutBuilder(ABC):
 
 
 class DefaultUserCheckoutBuilder(CheckoutBuilder):
+    DISCOUNT_RATE = 0
+    DELIVERY_DATE = '10th May 2021'
+    SHIPPING_DETAILS = 'Address of the user'
+
+    @classmethod
+    def batch_totals(cls, carts):
+        return [sum(price for _, price in cart) for cart in carts]
+
+    @classmethod
+    def compute_discount(cls, total):
+        # Single discount rule shared by apply_discount and the batch path
+        return total * cls.DISCOUNT_RATE
+
+    @classmethod
+    def batch_discounts(cls, totals):
+        compute_discount = cls.compute_discount
+        return [compute_discount(total) for total in totals]
+
     def get_cart_products(self):
         print("Getting cart products for default user")
         self.cart = [['Laptops', 1000], ['Mobiles', 2000], ['Tablets', 3000]]
 
     def get_cart_total(self):
         print("Getting cart total for default user")
-        self.cart_value = sum([i[1] for i in self.cart])
+        self.cart_value = sum(price for _, price in self.cart)
 
     def get_cart_count(self):
         print("Getting cart count for default user")
@@ -55,16 +77,16 @@ class DefaultUserCheckoutBuilder(CheckoutBuilder):
 
     def apply_discount(self):
         print("Applying discount for default user")
-        self.discount = 0
+        self.discount = self.compute_discount(self.cart_value)
         self.cart_value = self.cart_value - self.discount
 
     def get_delivery_date(self):
         print("Getting delivery date for default user")
-        self.delivery_date = '10th May 2021'
+        self.delivery_date = self.DELIVERY_DATE
 
     def get_shipping_details(self):
         print("Getting shipping details for default user")
-        self.shipping_details = 'Address of the user'
+        self.shipping_details = self.SHIPPING_DETAILS
 
     def deliver(self):
         print("Delivering the products to the user")
@@ -79,34 +101,165 @@ class DefaultUserCheckoutBuilder(CheckoutBuilder):
 
 
 class PrimeUserCheckoutBuilder(DefaultUserCheckoutBuilder):
+    DISCOUNT_RATE = 0.1
+    DELIVERY_DATE = '5th May 2021'
 
     def apply_discount(self):
         print("Applying discount for prime user")
-        self.discount = self.cart_value * 0.1
+        self.discount = self.compute_discount(self.cart_value)
         self.cart_value = self.cart_value - self.discount
 
     def get_delivery_date(self):
         print("Getting delivery date for prime user")
-        self.delivery_date = '5th May 2021'
+        self.delivery_date = self.DELIVERY_DATE
+
+
+class CheckoutCache:
+    """
+    Content-addressed cache for the pricing steps of a checkout (total, count and discount).
+    The key is the builder type plus the cart contents themselves, so a changed cart simply misses the cache.
+    Once max_entries carts are cached the least recently used one is dropped.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def make_key(builder: CheckoutBuilder):
+        return type(builder), tuple((name, price) for name, price in builder.cart)
+
+    def get(self, builder: CheckoutBuilder):
+        key = self.make_key(builder)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self.saved_seconds += entry['elapsed']
+        return entry
+
+    def put(self, builder: CheckoutBuilder, elapsed):
+        key = self.make_key(builder)
+        self.entries[key] = {
+            'cart_value': builder.cart_value,
+            'cart_count': builder.cart_count,
+            'discount': builder.discount,
+            'elapsed': elapsed,
+        }
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, builder: CheckoutBuilder):
+        self.entries.pop(self.make_key(builder), None)
+
+    def clear(self):
+        self.entries.clear()
+
+    @property
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def metrics(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hit_ratio,
+            'saved_seconds': self.saved_seconds,
+        }
 
 
 class CheckoutDirector:
-    def __init__(self, builder: CheckoutBuilder):
+    def __init__(self, builder: CheckoutBuilder, cache: CheckoutCache = None):
         self.builder = builder
+        self.cache = cache
 
-    def construct(self):
-        self.builder.get_cart_products()
+    def price_cart(self):
+        if self.cache is not None:
+            entry = self.cache.get(self.builder)
+            if entry is not None:
+                self.builder.cart_value = entry['cart_value']
+                self.builder.cart_count = entry['cart_count']
+                self.builder.discount = entry['discount']
+                return
+
+        start = time.perf_counter()
         self.builder.get_cart_total()
         self.builder.get_cart_count()
         self.builder.apply_discount()
+        if self.cache is not None:
+            self.cache.put(self.builder, time.perf_counter() - start)
+
+    def construct(self):
+        self.builder.get_cart_products()
+        self.price_cart()
         self.builder.get_delivery_date()
         self.builder.get_shipping_details()
         self.builder.deliver()
         print('--------------------------------------------------------------')
 
 
+def _checkout_chunk(builder_class, carts):
+    totals = builder_class.batch_totals(carts)
+    discounts = builder_class.batch_discounts(totals)
+    return [
+        {
+            'products': cart,
+            'count': len(cart),
+            'total': total - discount,
+            'discount': discount,
+            'delivery_date': builder_class.DELIVERY_DATE,
+            'shipping_details': builder_class.SHIPPING_DETAILS,
+        }
+        for cart, total, discount in zip(carts, totals, discounts)
+    ]
+
+
+class BatchCheckoutDirector:
+    """
+    Checks out many carts with the same builder type. Steps run column-wise (total every cart, then discount every
+    cart) and the results come back as dicts instead of being printed. With workers > 1 the carts are split into
+    chunks and checked out in a process pool.
+    """
+
+    def __init__(self, builder_class, workers=1, chunk_size=10000):
+        self.builder_class = builder_class
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def construct(self, carts):
+        carts = list(carts)
+        if self.workers <= 1 or len(carts) <= self.chunk_size:
+            return _checkout_chunk(self.builder_class, carts)
+
+        chunks = [carts[i:i + self.chunk_size] for i in range(0, len(carts), self.chunk_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for chunk_result in executor.map(_checkout_chunk, repeat(self.builder_class), chunks):
+                results.extend(chunk_result)
+        return results
+
+
 if __name__ == '__main__':
     director = CheckoutDirector(DefaultUserCheckoutBuilder())
     director.construct()
     director = CheckoutDirector(PrimeUserCheckoutBuilder())
     director.construct()
+
+    # Repeated checkouts of an unchanged cart reuse the cached pricing
+    checkout_cache = CheckoutCache()
+    director = CheckoutDirector(PrimeUserCheckoutBuilder(), checkout_cache)
+    director.construct()
+    director.construct()
+    print(f'Checkout cache metrics: {checkout_cache.metrics()}')
+
+    # End-of-sale reprocessing of many carts at once
+    sale_carts = [[['Laptops', 1000 + i], ['Mobiles', 2000]] for i in range(1000)]
+    batch_results = BatchCheckoutDirector(PrimeUserCheckoutBuilder, workers=2, chunk_size=250).construct(sale_carts)
+    print(f'Checked out {len(batch_results)} carts, first: {batch_results[0]}')
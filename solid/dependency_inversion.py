@@ -43,8 +43,9 @@ class BadPaymentService:
 
 
 # Client code
-bad_payment_service = BadPaymentService()
-bad_payment_service.process_payment(100)
+if __name__ == "__main__":
+    bad_payment_service = BadPaymentService()
+    bad_payment_service.process_payment(100)
 
 # Output:
 # Processing payment of $100
@@ -87,9 +88,10 @@ class PaymentService:
 
 
 # Client code
-credit_card_processor = CreditCardProcessor()
-payment_service = PaymentService(credit_card_processor)
-payment_service.process_payment(100)
+if __name__ == "__main__":
+    credit_card_processor = CreditCardProcessor()
+    payment_service = PaymentService(credit_card_processor)
+    payment_service.process_payment(100)
 
 # Output:
 # Processing credit card payment of $100
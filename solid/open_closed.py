@@ -65,11 +65,12 @@ class BadPaymentService:
 
 
 # Client code
-bad_payment_service = BadPaymentService()
-bad_payment_service.process_payment(100, "credit_card")
-bad_payment_service.process_payment(200, "bank_transfer")
-bad_payment_service.process_payment(50, "digital_wallet")
-bad_payment_service.process_payment(75, "cryptocurrency")
+if __name__ == "__main__":
+    bad_payment_service = BadPaymentService()
+    bad_payment_service.process_payment(100, "credit_card")
+    bad_payment_service.process_payment(200, "bank_transfer")
+    bad_payment_service.process_payment(50, "digital_wallet")
+    bad_payment_service.process_payment(75, "cryptocurrency")
 
 # Output:
 # Processing credit card payment of $100
@@ -1,5 +1,25 @@
+import io
 import json
+import mmap
+import os
+import re
+import sys
+import tempfile
+import time
 import xml.etree.ElementTree as et  # Python's built-in XML library
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+# Optional fast encoders, used only when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 
 # Existing XML data source
@@ -18,6 +38,40 @@ class XMLDataSource:
                     </stock_data>"""
         return xml_data
 
+    def get_stream(self):
+        return io.BytesIO(self.get_data().encode())
+
+
+# XML data source backed by a (possibly multi-GB) file on disk
+class XMLFileDataSource(XMLDataSource):
+    def __init__(self, path):
+        self.path = path
+
+    def get_data(self):
+        # Bytes, so the parser honours the encoding in the XML declaration
+        with open(self.path, 'rb') as xml_file:
+            return xml_file.read()
+
+    def get_stream(self):
+        return open(self.path, 'rb')
+
+
+# A slice of an XML file holding whole <stock> elements, re-wrapped so it parses on its own. The header is the
+# document's prolog plus the root start tag, so the XML declaration (and its encoding) carries over to every slice.
+class XMLByteRangeDataSource(XMLFileDataSource):
+    def __init__(self, path, start, end, header=b'<stock_data>'):
+        super().__init__(path)
+        self.start = start
+        self.end = end
+        self.header = header
+
+    def get_data(self):
+        return self.get_stream().getvalue()
+
+    def get_stream(self):
+        with open(self.path, 'rb') as xml_file, mmap.mmap(xml_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return io.BytesIO(self.header + mapped[self.start:self.end] + b'</stock_data>')
+
 
 # 3rd-party analytics library that works with JSON data
 class AnalyticsLibrary:
@@ -26,6 +80,46 @@ class AnalyticsLibrary:
         print("Analyzing JSON data:")
         print(json_data)
 
+    def analyze_columns(self, stock_columns):
+        # Works on the columns directly, no JSON string to re-parse
+        print("Analyzing stock columns:")
+        prices = stock_columns.prices
+        average = sum(prices) / len(prices) if prices else 0.0
+        print(f"{len(prices)} stocks, average price {average:.2f}")
+
+
+# Columnar form of the stock feed: a symbol list and a float64 price array
+class StockColumns:
+    def __init__(self):
+        self.symbols = []
+        self.prices = array('d')
+
+    def append(self, symbol, price):
+        self.symbols.append(symbol)
+        self.prices.append(price)
+
+    def to_records(self):
+        return [{'symbol': symbol, 'price': price} for symbol, price in zip(self.symbols, self.prices)]
+
+
+def _json_encode(records):
+    return json.dumps(records)
+
+
+def _orjson_encode(records):
+    return orjson.dumps(records)
+
+
+def _msgpack_encode(records):
+    return msgpack.packb(records)
+
+
+SERIALIZERS = {'json': _json_encode}
+if orjson is not None:
+    SERIALIZERS['orjson'] = _orjson_encode
+if msgpack is not None:
+    SERIALIZERS['msgpack'] = _msgpack_encode
+
 
 # Adapter to convert XML data to JSON for the analytics library
 class XMLToJSONAdapter:
@@ -45,11 +139,236 @@ class XMLToJSONAdapter:
 
         return json.dumps(stock_list)
 
+    def get_columns(self):
+        root = et.fromstring(self.xml_data_source.get_data())
+        stock_columns = StockColumns()
+        for stock_element in root.findall('stock'):
+            stock_columns.append(stock_element.find('symbol').text, float(stock_element.find('price').text))
+        return stock_columns
+
+    def get_serialized_data(self, serializer='json'):
+        if serializer not in SERIALIZERS:
+            raise ValueError(f'Unknown or unavailable serializer: {serializer}')
+        return SERIALIZERS[serializer](self.get_columns().to_records())
+
+    def hand_off(self, analytics):
+        analytics.analyze_columns(self.get_columns())
+
+
+# Streaming adapter: parses <stock> elements one at a time and emits JSON incrementally
+class StreamingXMLToJSONAdapter:
+    def __init__(self, xml_data_source):
+        self.xml_data_source = xml_data_source
+
+    def iter_stocks(self):
+        with self.xml_data_source.get_stream() as stream:
+            root = None
+            for event, element in et.iterparse(stream, events=('start', 'end')):
+                if root is None:
+                    root = element
+                elif event == 'end' and element.tag == 'stock':
+                    yield {'symbol': element.findtext('symbol'), 'price': float(element.findtext('price'))}
+                    # Drop the parsed element so memory stays flat regardless of the feed size
+                    root.clear()
+
+    def iter_json_lines(self):
+        for stock_data in self.iter_stocks():
+            yield json.dumps(stock_data) + '\n'
+
+    def iter_json_array(self):
+        # Same output as XMLToJSONAdapter.get_json_data, emitted piece by piece
+        yield '['
+        for index, stock_data in enumerate(self.iter_stocks()):
+            yield ', ' + json.dumps(stock_data) if index else json.dumps(stock_data)
+        yield ']'
+
+    def get_json_data(self):
+        return ''.join(self.iter_json_array())
+
+
+def _convert_byte_range(path, start, end, header, separator):
+    adapter = StreamingXMLToJSONAdapter(XMLByteRangeDataSource(path, start, end, header))
+    return separator.join(json.dumps(stock_data) for stock_data in adapter.iter_stocks())
+
+
+# Parallel adapter: splits the file at <stock> boundaries and converts the byte ranges in a process pool
+class ParallelXMLToJSONAdapter:
+    # A <stock> start tag, with or without attributes
+    STOCK_START = re.compile(rb'<stock[\s/>]')
+    ROOT_START = re.compile(rb'<stock_data(?:\s[^>]*)?>')
+
+    def __init__(self, xml_file_data_source, workers=None, chunks_per_worker=4):
+        self.xml_data_source = xml_file_data_source
+        self.workers = workers or os.cpu_count()
+        self.chunks_per_worker = chunks_per_worker
+
+    def split_byte_ranges(self):
+        # Returns the header (prolog plus root start tag) and the byte ranges of whole <stock> elements
+        with open(self.xml_data_source.path, 'rb') as xml_file:
+            with mmap.mmap(xml_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                root = self.ROOT_START.search(mapped)
+                last = mapped.rfind(b'</stock_data>')
+                if root is None or last == -1:
+                    raise ValueError('Expected a <stock_data> document')
+                header = mapped[:root.end()]
+                first = self.STOCK_START.search(mapped, root.end(), last)
+                if first is None:
+                    return header, []
+
+                chunk_size = max(1, (last - first.start()) // (self.workers * self.chunks_per_worker))
+                ranges = []
+                start = first.start()
+                while start < last:
+                    boundary = self.STOCK_START.search(mapped, min(start + chunk_size, last), last)
+                    end = boundary.start() if boundary else last
+                    ranges.append((start, end))
+                    start = end
+                return header, ranges
+
+    def _iter_fragments(self, separator):
+        header, ranges = self.split_byte_ranges()
+        path = self.xml_data_source.path
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # executor.map yields results in submission order, which keeps the output in document order
+            futures = executor.map(
+                _convert_byte_range,
+                [path] * len(ranges), [start for start, _ in ranges], [end for _, end in ranges],
+                [header] * len(ranges), [separator] * len(ranges),
+            )
+            for fragment in futures:
+                if fragment:
+                    yield fragment
+
+    def iter_json_lines(self):
+        for fragment in self._iter_fragments('\n'):
+            yield fragment + '\n'
+
+    def iter_json_array(self):
+        yield '['
+        for index, fragment in enumerate(self._iter_fragments(', ')):
+            yield ', ' + fragment if index else fragment
+        yield ']'
+
+    def get_json_data(self):
+        return ''.join(self.iter_json_array())
+
+
+def write_synthetic_feed(path, size_mb):
+    stock = '<stock><symbol>SYM{:07d}</symbol><price>{:.2f}</price></stock>\n'
+    target = size_mb * 1024 * 1024
+    written = 0
+    index = 0
+    with open(path, 'w', encoding='utf-8') as feed:
+        feed.write('<stock_data>\n')
+        while written < target:
+            line = stock.format(index, 100 + index % 5000 / 100)
+            feed.write(line)
+            written += len(line)
+            index += 1
+        feed.write('</stock_data>\n')
+    return index
+
+
+def benchmark_streaming(size_mb=1024):
+    import resource
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'feed.xml')
+        stock_count = write_synthetic_feed(path, size_mb)
+        adapter = StreamingXMLToJSONAdapter(XMLFileDataSource(path))
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as sink:
+            sink.writelines(adapter.iter_json_lines())
+        elapsed = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(f'Streamed {stock_count} stocks ({size_mb} MB) in {elapsed:.2f}s, '
+          f'peak RSS grew by {(rss_after - rss_before) / 1024:.1f} MB')
+
+
+def benchmark_parallel(size_mb=256):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'feed.xml')
+        stock_count = write_synthetic_feed(path, size_mb)
+        data_source = XMLFileDataSource(path)
+
+        start = time.perf_counter()
+        single_output = StreamingXMLToJSONAdapter(data_source).get_json_data()
+        single_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel_output = ParallelXMLToJSONAdapter(data_source).get_json_data()
+        parallel_elapsed = time.perf_counter() - start
+
+    print(f'Converted {stock_count} stocks ({size_mb} MB): single {single_elapsed:.2f}s, '
+          f'parallel on {os.cpu_count()} cores {parallel_elapsed:.2f}s, '
+          f'identical output: {single_output == parallel_output}')
+
+
+def benchmark_serializers(stock_count=1_000_000):
+    stock_columns = StockColumns()
+    for index in range(stock_count):
+        stock_columns.append(f'SYM{index:07d}', 100 + index % 5000 / 100)
+    records = stock_columns.to_records()
+
+    for name, encode in SERIALIZERS.items():
+        start = time.perf_counter()
+        encoded = encode(records)
+        print(f'{name}: {time.perf_counter() - start:.3f}s, {len(encoded) / 1024 / 1024:.1f} MB')
+
+    start = time.perf_counter()
+    prices = stock_columns.prices
+    average = sum(prices) / len(prices)
+    print(f'columnar hand-off: {time.perf_counter() - start:.3f}s, '
+          f'{prices.itemsize * len(prices) / 1024 / 1024:.1f} MB of prices (average {average:.2f})')
+
+
+def check_parallel_equivalence():
+    # Feeds that are easy to get wrong when splitting by bytes: attributes, self-closing tags and a non-UTF-8 encoding
+    feeds = {
+        'attributes.xml': ('<?xml version="1.0" encoding="UTF-8"?>\n<stock_data source="feed">'
+                           '<stock id="1"><symbol>AAPL</symbol><price>150.32</price></stock>\n'
+                           '<stock\tid="2"><symbol>GOOGL</symbol><price>2700.45</price></stock>\n'
+                           '<stock><symbol>MSFT</symbol><price>310.5</price></stock></stock_data>\n', 'utf-8'),
+        'latin1.xml': ('<?xml version="1.0" encoding="ISO-8859-1"?>\n<stock_data>'
+                       + ''.join(f'<stock><symbol>SOCI\u00c9T\u00c9{index}</symbol><price>{index}.5</price></stock>'
+                                 for index in range(50))
+                       + '</stock_data>\n', 'iso-8859-1'),
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, (content, encoding) in feeds.items():
+            path = os.path.join(tmp_dir, name)
+            with open(path, 'wb') as feed:
+                feed.write(content.encode(encoding))
+            data_source = XMLFileDataSource(path)
+            expected = XMLToJSONAdapter(data_source).get_json_data()
+            for workers in (1, 3):
+                adapter = ParallelXMLToJSONAdapter(data_source, workers=workers, chunks_per_worker=7)
+                if adapter.get_json_data() != expected:
+                    raise AssertionError(f'Parallel output differs from the single-threaded adapter for {name}')
+    print('Parallel adapter output matches the single-threaded adapter')
+
 
 # Client code
-xml_data_source = XMLDataSource()
-adapter = XMLToJSONAdapter(xml_data_source)
-json_data = adapter.get_json_data()
+if __name__ == '__main__':
+    xml_data_source = XMLDataSource()
+    adapter = XMLToJSONAdapter(xml_data_source)
+    json_data = adapter.get_json_data()
+
+    analytics = AnalyticsLibrary()
+    analytics.analyze_data(json_data)
+
+    streaming_adapter = StreamingXMLToJSONAdapter(XMLDataSource())
+    for json_line in streaming_adapter.iter_json_lines():
+        print(json_line, end='')
+
+    check_parallel_equivalence()
+    XMLToJSONAdapter(XMLDataSource()).hand_off(AnalyticsLibrary())
 
-analytics = AnalyticsLibrary()
-analytics.analyze_data(json_data)
+    if '--benchmark' in sys.argv:
+        # Streams a 1 GB synthetic feed; memory stays flat while the feed grows
+        benchmark_streaming(size_mb=1024)
+        benchmark_parallel(size_mb=256)
+        benchmark_serializers()
@@ -10,6 +10,12 @@ Let's consider a real-life problem in a drawing application. You have different
 squares, and you also want to support different rendering modes, such as rendering to the screen or printing to paper.
 Without the Bridge Pattern, you might end up with a complex hierarchy of classes like this:
 """
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import redirect_stdout
+from functools import cached_property
 
 
 class CircleScreen:
@@ -47,6 +53,22 @@ class Renderer:
     def render(self):
         pass
 
+    @cached_property
+    def suffix(self):
+        # Computed once per renderer instead of once per shape
+        return self.render()
+
+    def render_batch(self, shapes, out=None):
+        # The shapes describe themselves; the renderer only adds its cached suffix and writes the batch at once
+        groups = defaultdict(list)
+        for shape in shapes:
+            groups[type(shape)].append(shape)
+
+        suffix = self.suffix
+        lines = [shape.describe() + suffix for group in groups.values() for shape in group]
+        if lines:
+            (out or sys.stdout).write("\n".join(lines) + "\n")
+
 
 class ScreenRenderer(Renderer):
     def render(self):
@@ -62,18 +84,52 @@ class Shape:
     def __init__(self, renderer):
         self.renderer = renderer
 
+    def describe(self):
+        raise NotImplementedError
+
     def draw(self):
         raise NotImplementedError
 
 
 class Circle(Shape):
+    def describe(self):
+        return "Drawing a circle"
+
     def draw(self):
-        print("Drawing a circle" + self.renderer.render())
+        print(self.describe() + self.renderer.render())
 
 
 class Square(Shape):
+    def describe(self):
+        return "Drawing a square"
+
     def draw(self):
-        print("Drawing a square" + self.renderer.render())
+        print(self.describe() + self.renderer.render())
+
+
+def draw_batch(shapes, out=None):
+    by_renderer = defaultdict(list)
+    for shape in shapes:
+        by_renderer[shape.renderer].append(shape)
+    for renderer, renderer_shapes in by_renderer.items():
+        renderer.render_batch(renderer_shapes, out)
+
+
+def benchmark_rendering(shape_count=1_000_000):
+    renderers = [ScreenRenderer(), PrinterRenderer()]
+    shapes = [(Circle, Square)[i % 2](renderers[i % 3 % 2]) for i in range(shape_count)]
+
+    with open(os.devnull, "w") as sink, redirect_stdout(sink):
+        start = time.perf_counter()
+        for shape in shapes:
+            shape.draw()
+        per_shape = time.perf_counter() - start
+
+        start = time.perf_counter()
+        draw_batch(shapes, sink)
+        batched = time.perf_counter() - start
+
+    print(f"{shape_count} shapes: per-shape draw() {per_shape:.3f}s, batched {batched:.3f}s")
 
 
 if __name__ == "__main__":
@@ -83,3 +139,8 @@ if __name__ == "__main__":
     shapes = [Circle(screen_renderer), Circle(printer_renderer), Square(screen_renderer), Square(printer_renderer)]
     for shape in shapes:
         shape.draw()
+
+    # The same scene rendered in one write per renderer
+    draw_batch(shapes)
+    if '--benchmark' in sys.argv:
+        benchmark_rendering()
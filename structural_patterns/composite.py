@@ -19,37 +19,266 @@ composite. Each shape, including groups, implements this interface, allowing the
 Composite means "made up of several individual parts".
 """
 
+import io
+import sys
+import time
+import tracemalloc
 from abc import ABC, abstractmethod
+from array import array
+from contextlib import redirect_stdout
 
 
 class Shape(ABC):
+    # Empty slots so that subclasses declaring __slots__ (FlatShapeView) really go without a per-instance __dict__
+    __slots__ = ()
+
     @abstractmethod
     def draw(self):
         pass
 
+    def render(self):
+        # Fallback for shapes that only know how to draw: capture what draw() prints. redirect_stdout swaps the
+        # process-wide sys.stdout, so this is not thread-safe; shapes drawn from several threads should override it.
+        buffer = io.StringIO()
+        with redirect_stdout(buffer):
+            self.draw()
+        return buffer.getvalue().rstrip('\n')
+
 
 class Circle(Shape):
+    def render(self):
+        return 'Drawing Circle'
+
     def draw(self):
-        print('Drawing Circle')
+        print(self.render())
 
 
 class Rectangle(Shape):
+    def render(self):
+        return 'Drawing Rectangle'
+
     def draw(self):
-        print('Drawing Rectangle')
+        print(self.render())
 
 
 class CompositeShape(Shape):
+    """
+    Keeps a cached leaf count that is recomputed only when the subtree changes. add_shape marks the composite and
+    all of its ancestors dirty; clean subtrees, including ones shared by several parents, reuse their count as-is.
+    Rendered output is not cached: draw() streams it line by line from the child references, so memory stays
+    proportional to the tree rather than to its size times its depth. Both walks use an explicit stack, so deep
+    trees do not hit the recursion limit.
+    """
 
     def __init__(self):
         self.shapes = []
+        self.parents = []
+        self._count_dirty = True
+        self._leaf_count = 0
 
     def add_shape(self, shape):
         self.shapes.append(shape)
+        if isinstance(shape, CompositeShape) and not any(parent is self for parent in shape.parents):
+            shape.parents.append(self)
+        self.invalidate()
+
+    def invalidate(self):
+        # A dirty node always has dirty ancestors, so the walk stops at the first dirty one
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node._count_dirty and node is not self:
+                continue
+            node._count_dirty = True
+            stack.extend(node.parents)
+
+    def _refresh_counts(self):
+        stack = [(self, False)]
+        while stack:
+            node, children_ready = stack.pop()
+            if not node._count_dirty:
+                continue
+            if not children_ready:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.shapes
+                             if isinstance(child, CompositeShape) and child._count_dirty)
+                continue
+            node._leaf_count = sum(child._leaf_count if isinstance(child, CompositeShape) else 1
+                                   for child in node.shapes)
+            node._count_dirty = False
+
+    def leaf_count(self):
+        self._refresh_counts()
+        return self._leaf_count
+
+    def iter_lines(self):
+        # Pre-order walk; children are pushed in reverse so they come out in insertion order
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, CompositeShape):
+                yield 'Drawing a Complex Composite Shape'
+                stack.extend(reversed(node.shapes))
+            else:
+                yield node.render()
+
+    def render(self):
+        return '\n'.join(self.iter_lines())
+
+    def draw(self):
+        sys.stdout.writelines(line + '\n' for line in self.iter_lines())
+
+
+class FlatShapeTree:
+    """
+    Compact storage for very large shape trees. Each node is an index: node_types holds a type code, parents holds the
+    parent index (-1 for a root) and the children are kept in CSR layout (child_offsets into children). A parent is
+    always added before its children, so aggregates can be computed in one reverse pass over the arrays.
+    FlatShapeView exposes any node through the usual Shape interface.
+    """
+    COMPOSITE, CIRCLE, RECTANGLE = 0, 1, 2
+    LEAF_OUTPUT = {CIRCLE: 'Drawing Circle', RECTANGLE: 'Drawing Rectangle'}
+
+    def __init__(self):
+        self.node_types = array('B')
+        self.parents = array('i')
+        self._child_offsets = None
+        self._children = None
+        self._leaf_counts = None
+
+    def add_node(self, type_code, parent=-1):
+        if parent >= len(self.node_types):
+            raise ValueError('A parent must be added before its children')
+        self.node_types.append(type_code)
+        self.parents.append(parent)
+        self._child_offsets = None
+        self._leaf_counts = None
+        return len(self.node_types) - 1
+
+    @classmethod
+    def type_code_of(cls, shape):
+        # isinstance, so subclasses of the known shapes map to their base type code
+        for shape_type, type_code in ((CompositeShape, cls.COMPOSITE), (Circle, cls.CIRCLE),
+                                      (Rectangle, cls.RECTANGLE)):
+            if isinstance(shape, shape_type):
+                return type_code
+        raise TypeError(f'{type(shape).__name__} has no flat type code')
+
+    @classmethod
+    def from_shape(cls, shape):
+        tree = cls()
+        stack = [(shape, -1)]
+        while stack:
+            node, parent = stack.pop()
+            index = tree.add_node(cls.type_code_of(node), parent)
+            if isinstance(node, CompositeShape):
+                stack.extend((child, index) for child in reversed(node.shapes))
+        return tree
+
+    def _build_csr(self):
+        # Counting sort of the nodes by parent; children stay in insertion order
+        size = len(self.parents)
+        offsets = array('I', bytes(4 * (size + 1)))
+        for parent in self.parents:
+            if parent >= 0:
+                offsets[parent + 1] += 1
+        for index in range(size):
+            offsets[index + 1] += offsets[index]
+
+        children = array('I', bytes(4 * offsets[size]))
+        cursor = array('I', offsets[:size])
+        for index, parent in enumerate(self.parents):
+            if parent >= 0:
+                children[cursor[parent]] = index
+                cursor[parent] += 1
+        self._child_offsets = offsets
+        self._children = children
+
+    def children_of(self, index):
+        if self._child_offsets is None:
+            self._build_csr()
+        return self._children[self._child_offsets[index]:self._child_offsets[index + 1]]
+
+    def leaf_counts(self):
+        # Cached until the next add_node, so per-view lookups stay O(1)
+        if self._leaf_counts is None:
+            self._leaf_counts = self._compute_leaf_counts()
+        return self._leaf_counts
+
+    def _compute_leaf_counts(self):
+        node_types = self.node_types
+        counts = array('I', (node_type != self.COMPOSITE for node_type in node_types))
+        parents = self.parents
+        for index in range(len(counts) - 1, 0, -1):
+            parent = parents[index]
+            if parent >= 0:
+                counts[parent] += counts[index]
+        return counts
+
+    def render(self, index=0):
+        lines = []
+        stack = [index]
+        while stack:
+            node = stack.pop()
+            node_type = self.node_types[node]
+            if node_type == self.COMPOSITE:
+                lines.append('Drawing a Complex Composite Shape')
+                stack.extend(reversed(self.children_of(node)))
+            else:
+                lines.append(self.LEAF_OUTPUT[node_type])
+        return '\n'.join(lines)
+
+    def view(self, index=0):
+        return FlatShapeView(self, index)
+
+
+class FlatShapeView(Shape):
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    def render(self):
+        return self.tree.render(self.index)
+
+    def leaf_count(self):
+        return self.tree.leaf_counts()[self.index]
 
     def draw(self):
-        print('Drawing a Complex Composite Shape')
-        for shape in self.shapes:
-            shape.draw()
+        print(self.render())
+
+
+def benchmark_flat_tree(group_count=10_000, leaves_per_group=100):
+    tracemalloc.start()
+    root = CompositeShape()
+    for _ in range(group_count):
+        group = CompositeShape()
+        for leaf in range(leaves_per_group):
+            group.add_shape(Circle() if leaf % 2 else Rectangle())
+        root.add_shape(group)
+    object_memory = tracemalloc.get_traced_memory()[0]
+
+    tree = FlatShapeTree()
+    flat_root = tree.add_node(FlatShapeTree.COMPOSITE)
+    for _ in range(group_count):
+        group = tree.add_node(FlatShapeTree.COMPOSITE, flat_root)
+        for leaf in range(leaves_per_group):
+            tree.add_node(FlatShapeTree.CIRCLE if leaf % 2 else FlatShapeTree.RECTANGLE, group)
+    flat_memory = tracemalloc.get_traced_memory()[0] - object_memory
+    tracemalloc.stop()
+
+    # Both sides time the first leaf count only: neither renders, and neither has a cached count yet
+    start = time.perf_counter()
+    object_leaves = root.leaf_count()
+    object_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    flat_leaves = tree.leaf_counts()[flat_root]
+    flat_time = time.perf_counter() - start
+
+    print(f'{object_leaves} leaves as objects: {object_memory / 1024 / 1024:.1f} MB, aggregated in {object_time:.3f}s')
+    print(f'{flat_leaves} leaves as flat arrays: {flat_memory / 1024 / 1024:.1f} MB, aggregated in {flat_time:.3f}s')
 
 
 if __name__ == '__main__':
@@ -61,4 +290,21 @@ if __name__ == '__main__':
     complex_shape.add_shape(circle)
     complex_shape.add_shape(rectangle)
 
-    complex_shape.draw()
\ No newline at end of file
+    complex_shape.draw()
+
+    # A subtree shared by two parents is drawn from the same child references; its leaf count is computed once
+    group = CompositeShape()
+    group.add_shape(complex_shape)
+    group.add_shape(complex_shape)
+    group.draw()
+    print(f'Leaves in group: {group.leaf_count()}')
+
+    complex_shape.add_shape(Circle())
+    print(f'Leaves after adding a circle: {group.leaf_count()}')
+
+    flat_shape = FlatShapeTree.from_shape(group).view()
+    flat_shape.draw()
+    print(f'Leaves in flat group: {flat_shape.leaf_count()}')
+
+    if '--benchmark' in sys.argv:
+        benchmark_flat_tree()
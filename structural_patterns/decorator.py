@@ -5,6 +5,8 @@ It's often used to extend the functionality of classes in a flexible and reusabl
 
 Adapter changes the behaviour but decorator adds/enhances new behaviour.
 """
+import sys
+import time
 from abc import ABC, abstractmethod
 
 
@@ -26,6 +28,10 @@ class PlainText(TextComponent):
 
 # Decorator class
 class TextDecorator(TextComponent):
+    # Decorators that only wrap the text set these; compile_decorators keeps any other decorator as-is
+    prefix = None
+    suffix = None
+
     def __init__(self, text_component: TextComponent):
         self._text_component = text_component
 
@@ -36,22 +42,81 @@ class TextDecorator(TextComponent):
 
 # Concrete decorator classes for text formatting
 class BoldDecorator(TextDecorator):
+    prefix = "<b>"
+    suffix = "</b>"
+
     def display(self):
-        return "<b>" + self._text_component.display() + "</b>"
+        return self.prefix + self._text_component.display() + self.suffix
 
 
 class ItalicDecorator(TextDecorator):
+    prefix = "<i>"
+    suffix = "</i>"
+
     def display(self):
-        return "<i>" + self._text_component.display() + "</i>"
+        return self.prefix + self._text_component.display() + self.suffix
 
 
 class ColorDecorator(TextDecorator):
+    suffix = "</span>"
+
     def __init__(self, text_component: TextComponent, color: str):
         super().__init__(text_component)
         self._color = color
+        self.prefix = f'<span style="color:{color};">'
+
+    def display(self):
+        return self.prefix + self._text_component.display() + self.suffix
+
+
+# Compiled decorator chain: one prefix and one suffix applied in a single pass
+class CompiledText(TextComponent):
+    def __init__(self, text_component: TextComponent, prefix: str, suffix: str):
+        self._text_component = text_component
+        self._prefix = prefix
+        self._suffix = suffix
+
+    def format(self, content: str):
+        return self._prefix + content + self._suffix
 
     def display(self):
-        return f'<span style="color:{self._color};">{self._text_component.display()}</span>'
+        return self.format(self._text_component.display())
+
+
+def compile_decorators(text_component: TextComponent) -> CompiledText:
+    prefixes = []
+    suffixes = []
+    while (isinstance(text_component, TextDecorator)
+           and text_component.prefix is not None and text_component.suffix is not None):
+        prefixes.append(text_component.prefix)
+        suffixes.append(text_component.suffix)
+        text_component = text_component._text_component
+    return CompiledText(text_component, "".join(prefixes), "".join(reversed(suffixes)))
+
+
+def benchmark_compiled_chains(depths=(1, 5, 10, 25, 50), repeat=100_000):
+    for depth in depths:
+        text = PlainText("Hello, World!")
+        for level in range(depth):
+            if level % 3 == 0:
+                text = BoldDecorator(text)
+            elif level % 3 == 1:
+                text = ItalicDecorator(text)
+            else:
+                text = ColorDecorator(text, "blue")
+        compiled = compile_decorators(text)
+        assert compiled.display() == text.display()
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            text.display()
+        chained = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            compiled.display()
+        flattened = time.perf_counter() - start
+        print(f"depth {depth}: chain {chained:.3f}s, compiled {flattened:.3f}s, speedup {chained / flattened:.1f}x")
 
 
 # Usage
@@ -66,9 +131,14 @@ if __name__ == "__main__":
     print("Italic and colored text:", italic_and_color_text.display())
     # Output: Italic and colored text: <span style="color:blue;"><i>Hello, World!</i></span>
 
+    print("Compiled chain:", compile_decorators(italic_and_color_text).display())
+    if '--benchmark' in sys.argv:
+        benchmark_compiled_chains()
+
 
 # One more example
 from abc import ABC, abstractmethod
+from array import array
 
 class Coffee(ABC):
     @abstractmethod
@@ -80,19 +150,51 @@ class SimpleCoffee(Coffee):
         return 50
         
 
-class MilkDecorator(Coffee):
+class CoffeeDecorator(Coffee):
+    # Each add-on folds its price into a total once, at construction, so cost() is O(1) whatever the depth
+    extra_cost = 0
+
     def __init__(self, coffee):
         self.coffee = coffee
+        self._total_cost = coffee.cost() + self.extra_cost
 
     def cost(self):
-        return self.coffee.cost() + 30
+        return self._total_cost
 
-class SugarDecorator(Coffee):
-    def __init__(self, coffee):
-        self.coffee = coffee
 
-    def cost(self):
-        return self.coffee.cost() + 10
+class MilkDecorator(CoffeeDecorator):
+    extra_cost = 30
+
+
+class SugarDecorator(CoffeeDecorator):
+    extra_cost = 10
+
+
+# Modifier codes for pricing many orders without building decorator objects
+MILK, SUGAR = 1, 2
+MODIFIER_DECORATORS = {MILK: MilkDecorator, SUGAR: SugarDecorator}
+
+
+def build_order(modifier_codes):
+    coffee = SimpleCoffee()
+    for code in modifier_codes:
+        coffee = MODIFIER_DECORATORS[code](coffee)
+    return coffee
+
+
+def price_orders(modifier_codes, order_offsets):
+    """
+    Prices many orders at once. modifier_codes is a flat array('B') of modifier codes and order i uses
+    modifier_codes[order_offsets[i]:order_offsets[i + 1]].
+    """
+    base_cost = SimpleCoffee().cost()
+    # A dict rather than a list indexed by code, so unregistered codes raise KeyError just like build_order
+    extra_costs = {code: decorator.extra_cost for code, decorator in MODIFIER_DECORATORS.items()}
+
+    per_modifier = array('q', (extra_costs[code] for code in modifier_codes))
+    return array('q', (base_cost + sum(per_modifier[order_offsets[index]:order_offsets[index + 1]])
+                       for index in range(len(order_offsets) - 1)))
+
 
 if __name__ == "__main__":
     coffee = SimpleCoffee()
@@ -100,3 +202,11 @@ if __name__ == "__main__":
     add_sugar = SugarDecorator(add_milk)
 
     print(add_sugar.cost())
+
+    orders = [[MILK, SUGAR], [], [MILK, MILK, SUGAR, SUGAR, SUGAR]]
+    modifier_codes = array('B', (code for order in orders for code in order))
+    order_offsets = array('I', [0])
+    for order in orders:
+        order_offsets.append(order_offsets[-1] + len(order))
+    print(list(price_orders(modifier_codes, order_offsets)), [build_order(order).cost() for order in orders])
+
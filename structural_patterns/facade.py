@@ -13,6 +13,12 @@ The Facade Pattern suggests that you create a facade class that acts as a single
 with the complex system. The facade class encapsulates the functionality of the underlying components and provides a
 simplified interface.
 """
+import asyncio
+import inspect
+import os
+import sys
+import time
+from contextlib import redirect_stdout
 
 
 # Complex subsystems
@@ -81,6 +87,169 @@ class EntertainmentSystemFacade:
         self.smart_lighting.brighten_lights()
 
 
+# Stand-in for a networked device: every command costs a simulated round-trip
+class SimulatedDevice:
+    def __init__(self, device, latency=0.05):
+        self.device = device
+        self.latency = latency
+
+    def __getattr__(self, command):
+        method = getattr(self.device, command)
+
+        async def send():
+            await asyncio.sleep(self.latency)
+            return method()
+
+        return send
+
+
+# Facade that keeps a model of every device's state and sends only the commands needed to reach the target mode
+class AsyncEntertainmentSystemFacade:
+    IDLE_STATE = {"tv": "off", "sound_system": "off", "gaming_console": "stopped", "smart_lighting": "bright"}
+    MODE_STATES = {
+        None: IDLE_STATE,
+        "movie": {**IDLE_STATE, "tv": "on", "sound_system": "on", "smart_lighting": "dim"},
+        "gaming": {**IDLE_STATE, "gaming_console": "playing", "sound_system": "on", "smart_lighting": "dim"},
+    }
+    STATE_COMMANDS = {
+        "tv": {"on": "turn_on", "off": "turn_off"},
+        "sound_system": {"on": "turn_on", "off": "turn_off"},
+        "gaming_console": {"playing": "start_game", "stopped": "stop_game"},
+        "smart_lighting": {"dim": "dim_lights", "bright": "brighten_lights"},
+    }
+    # Starting a device waits for the devices it depends on to start; stopping it waits for its dependents to stop
+    DEPENDS_ON = {"gaming_console": ("sound_system",), "smart_lighting": ("tv", "gaming_console")}
+
+    def __init__(self, devices=None, timeout=1.0, retries=2):
+        self.devices = devices or {
+            "tv": TV(),
+            "sound_system": SoundSystem(),
+            "gaming_console": GamingConsole(),
+            "smart_lighting": SmartLighting(),
+        }
+        self.timeout = timeout
+        self.retries = retries
+        self.current_mode = None
+        self.desired_state = dict(self.IDLE_STATE)
+        # Unknown until the first transition has confirmed each device
+        self.actual_state = dict.fromkeys(self.IDLE_STATE)
+        self.round_trips = 0
+        self.transitions = 0
+
+    def forget_state(self):
+        # Actual state unknown (e.g. after a restart or a manual override): the next transition re-sends everything
+        self.actual_state = dict.fromkeys(self.actual_state)
+
+    async def _send(self, device_name, command):
+        # Timeouts and network errors are retried. A timed-out synchronous call cannot be cancelled and keeps running
+        # in its worker thread, so a retry may reach the device while the first attempt is still in flight; this is
+        # only safe because every command in STATE_COMMANDS sets an absolute state and repeating it is harmless.
+        # Any other exception is a device fault: it is not retried and the device is reported as failed (False)
+        # without aborting the commands sent to the other devices.
+        method = getattr(self.devices[device_name], command)
+        for attempt in range(self.retries + 1):
+            self.round_trips += 1
+            try:
+                if inspect.iscoroutinefunction(method):
+                    await asyncio.wait_for(method(), self.timeout)
+                else:
+                    await asyncio.wait_for(asyncio.to_thread(method), self.timeout)
+                return True
+            except (asyncio.TimeoutError, OSError):
+                if attempt == self.retries:
+                    return False
+                await asyncio.sleep(0.01 * 2 ** attempt)
+            except Exception:
+                return False
+
+    def plan_switch(self, target_mode):
+        # Returns the minimal commands as waves; devices within a wave do not depend on each other
+        target_state = self.MODE_STATES[target_mode]
+        pending = {device_name: self.STATE_COMMANDS[device_name][state]
+                   for device_name, state in target_state.items() if self.actual_state.get(device_name) != state}
+        stopping = {device_name for device_name in pending if target_state[device_name] == self.IDLE_STATE[device_name]}
+        blockers = {device_name: () for device_name in pending}
+        for device_name in pending:
+            for dependency in self.DEPENDS_ON.get(device_name, ()):
+                if dependency not in pending:
+                    continue
+                if device_name in stopping and dependency in stopping:
+                    # Reverse order on the way down: the dependency stops only after its dependent
+                    blockers[dependency] += (device_name,)
+                elif device_name not in stopping and dependency not in stopping:
+                    blockers[device_name] += (dependency,)
+
+        waves = []
+        while pending:
+            wave = {device_name: command for device_name, command in pending.items()
+                    if not any(blocker in pending for blocker in blockers[device_name])}
+            waves.append(wave)
+            for device_name in wave:
+                del pending[device_name]
+        return waves
+
+    async def switch_mode(self, target_mode):
+        self.desired_state = dict(self.MODE_STATES[target_mode])
+        results = {}
+        for wave in self.plan_switch(target_mode):
+            sent = await asyncio.gather(*(self._send(device_name, command) for device_name, command in wave.items()))
+            for device_name, ok in zip(wave, sent):
+                self.actual_state[device_name] = self.desired_state[device_name] if ok else None
+                results[device_name] = ok
+        self.current_mode = target_mode
+        self.transitions += 1
+        return results
+
+    def metrics(self):
+        return {
+            "round_trips": self.round_trips,
+            "transitions": self.transitions,
+            "round_trips_per_transition": self.round_trips / self.transitions if self.transitions else 0.0,
+        }
+
+
+def benchmark_mode_switch(latency=0.05):
+    facade_commands = {
+        "movie": (["tv", "turn_on"], ["sound_system", "turn_on"], ["smart_lighting", "dim_lights"]),
+        "gaming": (["gaming_console", "start_game"], ["sound_system", "turn_on"], ["smart_lighting", "dim_lights"]),
+    }
+    stop_commands = {
+        "movie": (["tv", "turn_off"], ["sound_system", "turn_off"], ["smart_lighting", "brighten_lights"]),
+        "gaming": (["gaming_console", "stop_game"], ["sound_system", "turn_off"], ["smart_lighting", "brighten_lights"]),
+    }
+
+    async def sequential(facade, sequence):
+        # What EntertainmentSystemFacade does: stop the current mode, start the next one, one command at a time
+        for target_mode in sequence:
+            commands = list(stop_commands.get(facade.current_mode, ())) + list(facade_commands.get(target_mode, ()))
+            for device_name, command in commands:
+                await facade._send(device_name, command)
+            facade.current_mode = target_mode
+            facade.transitions += 1
+
+    async def concurrent(facade, sequence):
+        for target_mode in sequence:
+            await facade.switch_mode(target_mode)
+
+    sequence = ["movie", "gaming", "movie", "gaming", None]
+    results = {}
+    with open(os.devnull, "w") as sink, redirect_stdout(sink):
+        for name, run in (("sequential", sequential), ("concurrent + state diff", concurrent)):
+            facade = AsyncEntertainmentSystemFacade({
+                "tv": SimulatedDevice(TV(), latency),
+                "sound_system": SimulatedDevice(SoundSystem(), latency),
+                "gaming_console": SimulatedDevice(GamingConsole(), latency),
+                "smart_lighting": SimulatedDevice(SmartLighting(), latency),
+            })
+            start = time.perf_counter()
+            asyncio.run(run(facade, sequence))
+            results[name] = (time.perf_counter() - start, facade.round_trips)
+
+    for name, (elapsed, round_trips) in results.items():
+        print(f"{name}: {elapsed:.3f}s and {round_trips} device round-trips for {len(sequence)} mode switches "
+              f"at {latency * 1000:.0f} ms per command")
+
+
 # Client code
 if __name__ == "__main__":
     entertainment_system = EntertainmentSystemFacade()
@@ -94,3 +263,11 @@ if __name__ == "__main__":
     entertainment_system.start_gaming_mode()
     # ... User plays the game ...
     entertainment_system.stop_gaming_mode()
+
+    print("\nSwitching modes concurrently:")
+    async_system = AsyncEntertainmentSystemFacade()
+    asyncio.run(async_system.switch_mode("movie"))
+    print(asyncio.run(async_system.switch_mode("gaming")))
+    print(async_system.metrics())
+    if '--benchmark' in sys.argv:
+        benchmark_mode_switch()
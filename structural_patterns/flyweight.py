@@ -14,10 +14,17 @@ The Flyweight Pattern suggests that you separate the intrinsic state (shared and
 characters (e.g. font, size), while the extrinsic state represents the context-specific properties
 (e.g. position on the screen)
 """
-from typing import Dict, Tuple
+import sys
+import time
+import tracemalloc
+from array import array
+from collections import OrderedDict
+from typing import Optional, Tuple
 
 
 class Character:
+    __slots__ = ('char', 'font', 'size', 'color')
+
     def __init__(self, char, font, size, color):
         self.char = char
         self.font = font
@@ -29,23 +36,345 @@ class Character:
 
 
 class CharacterFactory:
-    def __init__(self):
-        self.characters: Dict[Tuple, Character] = {}
+    """
+    Intern pool of Character flyweights keyed on (char, font, size, color). With max_size set, the pool evicts the
+    least recently used flyweight once it is full.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.characters: OrderedDict[Tuple, Character] = OrderedDict()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
 
     def get_character(self, char, font, size, color):
         key = (char, font, size, color)
-        if char not in self.characters:
-            self.characters[key] = Character(char, font, size, color)
-        return self.characters[key]
+        character = self.characters.get(key)
+        if character is not None:
+            self.hits += 1
+            if self.max_size is not None:
+                self.characters.move_to_end(key)
+            return character
+
+        self.misses += 1
+        character = self.characters[key] = Character(char, font, size, color)
+        if self.max_size is not None and len(self.characters) > self.max_size:
+            self.characters.popitem(last=False)
+        return character
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'pool_size': len(self.characters)}
 
 
 class WordProcessor:
-    def __init__(self):
-        self.factory = CharacterFactory()
-        self.characters = []
+    """
+    Keeps the extrinsic state in parallel compact arrays: a flyweight id per character plus its x and y position.
+    Ids index into self.flyweights, so they stay valid even if the factory's pool evicts a Character.
+    """
+
+    def __init__(self, factory: Optional[CharacterFactory] = None):
+        self.factory = factory or CharacterFactory()
+        self.flyweights = []
+        self._flyweight_ids = {}
+        self.flyweight_ids = array('I')
+        self.xs = array('i')
+        self.ys = array('i')
+
+    def __len__(self):
+        return len(self.flyweight_ids)
+
+    def flyweight_id(self, char, font, size, color):
+        key = (char, font, size, color)
+        flyweight_id = self._flyweight_ids.get(key)
+        if flyweight_id is None:
+            flyweight_id = self._flyweight_ids[key] = len(self.flyweights)
+            self.flyweights.append(self.factory.get_character(char, font, size, color))
+        return flyweight_id
 
     def add_character(self, char, font, size, color, x, y):
-        self.characters.append(self.factory.get_character(char, font, size, color).display(x, y))
+        flyweight_id = self.flyweight_id(char, font, size, color)
+        self.flyweight_ids.append(flyweight_id)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.flyweights[flyweight_id].display(x, y)
+
+    def add_text(self, text, font, size, color, x=0, y=0):
+        # Bulk ingestion: characters are laid out left to right and each newline starts the next row
+        ids = {char: self.flyweight_id(char, font, size, color) for char in set(text) if char != '\n'}
+        for row, line in enumerate(text.split('\n')):
+            self.flyweight_ids.extend(map(ids.__getitem__, line))
+            self.xs.extend(range(x, x + len(line)))
+            self.ys.extend([y + row] * len(line))
+
+    def get_range(self, start, stop):
+        flyweights = self.flyweights
+        return [(flyweights[flyweight_id], x, y) for flyweight_id, x, y in
+                zip(self.flyweight_ids[start:stop], self.xs[start:stop], self.ys[start:stop])]
+
+    def iter_runs(self, start=0, stop=None):
+        # Yields (style, text, x, y) for each run of adjacent characters sharing a style on the same row
+        stop = len(self) if stop is None else stop
+        flyweights = self.flyweights
+        run_start = start
+        for index in range(start + 1, stop + 1):
+            if index < stop:
+                current = flyweights[self.flyweight_ids[index]]
+                previous = flyweights[self.flyweight_ids[index - 1]]
+                if (current.font, current.size, current.color) == (previous.font, previous.size, previous.color) \
+                        and self.ys[index] == self.ys[index - 1] and self.xs[index] == self.xs[index - 1] + 1:
+                    continue
+            first = flyweights[self.flyweight_ids[run_start]]
+            text = ''.join(flyweights[flyweight_id].char for flyweight_id in self.flyweight_ids[run_start:index])
+            yield (first.font, first.size, first.color), text, self.xs[run_start], self.ys[run_start]
+            run_start = index
+
+    def render(self, out=None, start=0, stop=None):
+        out = out or sys.stdout
+        for (font, size, color), text, x, y in self.iter_runs(start, stop):
+            out.write(f'Displaying {text!r} in {font} {size} {color} at position ({x}, {y})\n')
+
+
+class _RopeLeaf:
+    __slots__ = ('text', 'flyweight_ids', 'length', 'newlines')
+    height = 0
+
+    def __init__(self, text, flyweight_ids):
+        self.text = text
+        self.flyweight_ids = flyweight_ids
+        self.length = len(text)
+        self.newlines = text.count('\n')
+
+
+class _RopeNode:
+    __slots__ = ('left', 'right', 'length', 'newlines', 'height')
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.length = left.length + right.length
+        self.newlines = left.newlines + right.newlines
+        self.height = max(left.height, right.height) + 1
+
+
+class Document:
+    """
+    Editable document on top of a WordProcessor's flyweights. The text lives in an immutable AVL-balanced rope whose
+    leaves hold a chunk of text and the matching flyweight ids, so insert and delete are O(log n) and every undo
+    snapshot shares all untouched subtrees with the current version. Laid-out lines are cached and an edit only
+    drops the lines it touched (or, when line breaks move, the lines from the edit onwards).
+    """
+    LEAF_SIZE = 1024
+
+    def __init__(self, word_processor: Optional[WordProcessor] = None):
+        self.word_processor = word_processor or WordProcessor()
+        self.root = None
+        self.undo_stack = []
+        self.layout_cache = {}
+
+    def __len__(self):
+        return self.root.length if self.root else 0
+
+    # Rope building blocks
+
+    @staticmethod
+    def _rotate_right(node):
+        left = node.left
+        return _RopeNode(left.left, _RopeNode(left.right, node.right))
+
+    @staticmethod
+    def _rotate_left(node):
+        right = node.right
+        return _RopeNode(_RopeNode(node.left, right.left), right.right)
+
+    @classmethod
+    def _balance(cls, node):
+        balance = node.left.height - node.right.height
+        if balance > 1:
+            if node.left.left.height < node.left.right.height:
+                node = _RopeNode(cls._rotate_left(node.left), node.right)
+            return cls._rotate_right(node)
+        if balance < -1:
+            if node.right.right.height < node.right.left.height:
+                node = _RopeNode(node.left, cls._rotate_right(node.right))
+            return cls._rotate_left(node)
+        return node
+
+    @classmethod
+    def _join(cls, left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.height > right.height + 1:
+            return cls._balance(_RopeNode(left.left, cls._join(left.right, right)))
+        if right.height > left.height + 1:
+            return cls._balance(_RopeNode(cls._join(left, right.left), right.right))
+        if left.height == right.height == 0 and left.length + right.length <= cls.LEAF_SIZE:
+            return _RopeLeaf(left.text + right.text, left.flyweight_ids + right.flyweight_ids)
+        return _RopeNode(left, right)
+
+    @classmethod
+    def _split(cls, node, index):
+        if node is None:
+            return None, None
+        if index <= 0:
+            return None, node
+        if index >= node.length:
+            return node, None
+        if node.height == 0:
+            return (_RopeLeaf(node.text[:index], node.flyweight_ids[:index]),
+                    _RopeLeaf(node.text[index:], node.flyweight_ids[index:]))
+        if index < node.left.length:
+            left, right = cls._split(node.left, index)
+            return left, cls._join(right, node.right)
+        left, right = cls._split(node.right, index - node.left.length)
+        return cls._join(node.left, left), right
+
+    def _build(self, text, font, size, color):
+        ids = {char: self.word_processor.flyweight_id(char, font, size, color) for char in set(text)}
+        level = [_RopeLeaf(text[start:start + self.LEAF_SIZE],
+                           array('I', map(ids.__getitem__, text[start:start + self.LEAF_SIZE])))
+                 for start in range(0, len(text), self.LEAF_SIZE)]
+        while len(level) > 1:
+            paired = [_RopeNode(level[index], level[index + 1]) for index in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                paired[-1] = self._join(paired[-1], level[-1])
+            level = paired
+        return level[0] if level else None
+
+    def _collect(self, node, start, stop, texts, flyweight_ids):
+        if node is None or start >= stop:
+            return
+        if node.height == 0:
+            texts.append(node.text[start:stop])
+            flyweight_ids.extend(node.flyweight_ids[start:stop])
+            return
+        left_length = node.left.length
+        if start < left_length:
+            self._collect(node.left, start, min(stop, left_length), texts, flyweight_ids)
+        if stop > left_length:
+            self._collect(node.right, max(start - left_length, 0), stop - left_length, texts, flyweight_ids)
+
+    @staticmethod
+    def _newlines_before(node, index):
+        count = 0
+        while node is not None and node.height:
+            if index < node.left.length:
+                node = node.left
+            else:
+                count += node.left.newlines
+                index -= node.left.length
+                node = node.right
+        return count + (node.text.count('\n', 0, index) if node is not None else 0)
+
+    @staticmethod
+    def _line_start(node, line):
+        # Index just past the line-th newline
+        if line == 0:
+            return 0
+        offset = 0
+        while node.height:
+            if line <= node.left.newlines:
+                node = node.left
+            else:
+                line -= node.left.newlines
+                offset += node.left.length
+                node = node.right
+        position = -1
+        for _ in range(line):
+            position = node.text.index('\n', position + 1)
+        return offset + position + 1
+
+    # Editing
+
+    def _edit(self, root, start_line, line_breaks_changed):
+        self.undo_stack.append(self.root)
+        self.root = root
+        if line_breaks_changed:
+            self.layout_cache = {line: cached for line, cached in self.layout_cache.items() if line < start_line}
+        else:
+            self.layout_cache.pop(start_line, None)
+
+    def insert(self, index, text, font, size, color):
+        left, right = self._split(self.root, index)
+        start_line = self._newlines_before(self.root, index) if self.root else 0
+        root = self._join(self._join(left, self._build(text, font, size, color)), right)
+        self._edit(root, start_line, '\n' in text)
+
+    def delete(self, start, stop):
+        start_line = self._newlines_before(self.root, start)
+        left, rest = self._split(self.root, start)
+        removed, right = self._split(rest, stop - start)
+        self._edit(self._join(left, right), start_line, bool(removed and removed.newlines))
+
+    def undo(self):
+        if self.undo_stack:
+            self.root = self.undo_stack.pop()
+            self.layout_cache = {}
+
+    # Reading
+
+    def text(self, start=0, stop=None):
+        texts = []
+        self._collect(self.root, start, len(self) if stop is None else stop, texts, array('I'))
+        return ''.join(texts)
+
+    def line_count(self):
+        return self.root.newlines + 1 if self.root else 1
+
+    def layout_line(self, line):
+        # Lays out one line as (Character, x, y) tuples, reusing the cached layout when the line is unchanged
+        cached = self.layout_cache.get(line)
+        if cached is None:
+            start = self._line_start(self.root, line) if self.root else 0
+            stop = self._line_start(self.root, line + 1) - 1 if line + 1 < self.line_count() else len(self)
+            texts, flyweight_ids = [], array('I')
+            self._collect(self.root, start, stop, texts, flyweight_ids)
+            flyweights = self.word_processor.flyweights
+            cached = self.layout_cache[line] = [(flyweights[flyweight_id], x, line)
+                                                for x, flyweight_id in enumerate(flyweight_ids)]
+        return cached
+
+
+def benchmark_document_typing(size_mb=10, keystrokes=1000):
+    text = ('The quick brown fox jumps over the lazy dog.\n' * (size_mb * 1024 * 1024 // 45))
+    document = Document()
+    document.insert(0, text, 'Arial', 12, 'blue')
+    middle = len(document) // 2
+
+    start = time.perf_counter()
+    for offset in range(keystrokes):
+        document.insert(middle + offset, 'x', 'Arial', 12, 'blue')
+        document.layout_line(document._newlines_before(document.root, middle + offset))
+    rope_time = time.perf_counter() - start
+
+    wp = WordProcessor()
+    wp.add_text(text, 'Arial', 12, 'blue')
+    flyweight_id = wp.flyweight_id('x', 'Arial', 12, 'blue')
+    middle = len(wp) // 2
+    start = time.perf_counter()
+    for offset in range(keystrokes):
+        wp.flyweight_ids.insert(middle + offset, flyweight_id)
+        wp.xs.insert(middle + offset, 0)
+        wp.ys.insert(middle + offset, 0)
+    array_time = time.perf_counter() - start
+
+    print(f'{keystrokes} keystrokes in the middle of a {size_mb} MB document: '
+          f'rope {rope_time:.3f}s, flat arrays {array_time:.3f}s, {len(document.undo_stack)} undo snapshots kept')
+
+
+def benchmark_intern_pool(char_count=1_000_000):
+    text = 'The quick brown fox jumps over the lazy dog. '
+    factory = CharacterFactory()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for index in range(char_count):
+        factory.get_character(text[index % len(text)], 'Arial', 12, 'blue')
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f'{char_count} characters added in {elapsed:.2f}s: {factory.misses} Character objects created, '
+          f'{memory / 1024:.1f} KB held by the pool')
 
 
 if __name__ == '__main__':
@@ -62,3 +391,22 @@ if __name__ == '__main__':
     wp.add_character('l', 'Arial', 12, 'blue', 0, 0)
     wp.add_character('d', 'Arial', 12, 'blue', 0, 0)
     wp.add_character('!', 'Arial', 12, 'blue', 0, 0)
+
+    print(wp.factory.stats())
+
+    wp.add_text('Bulk text\non two rows', 'Arial', 12, 'blue', 0, 1)
+    wp.add_text('in red', 'Arial', 12, 'red', 11, 2)
+    wp.render()
+    print([(character.char, x, y) for character, x, y in wp.get_range(0, 5)])
+
+    document = Document(wp)
+    document.insert(0, 'Hello\nWorld!', 'Arial', 12, 'blue')
+    document.insert(5, ', there', 'Arial', 12, 'red')
+    document.delete(0, 1)
+    print(repr(document.text()), [(character.char, x, y) for character, x, y in document.layout_line(1)])
+    document.undo()
+    print(repr(document.text()))
+
+    if '--benchmark' in sys.argv:
+        benchmark_intern_pool()
+        benchmark_document_typing()
@@ -12,8 +12,18 @@ The Proxy Pattern suggests that you create a proxy class that acts as an interme
 object (the web page in this case). The proxy controls access to the real object and can add additional behavior or
 checks before allowing access.
 """
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
-import requests
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from importlib.util import find_spec
+from typing import Dict
 
 
 class WebPage(ABC):
@@ -22,24 +32,111 @@ class WebPage(ABC):
         pass
 
 
+class PageLoadMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def record(self, elapsed):
+        with self.lock:
+            self.loads += 1
+            self.load_seconds += elapsed
+
+    def snapshot(self):
+        with self.lock:
+            return {'loads': self.loads, 'load_seconds': self.load_seconds}
+
+
 class RealWebPage(WebPage):
+    metrics = PageLoadMetrics()
+
     def __init__(self, url):
         self.url = url
+        self.content = None
         self.load()
 
     def load(self):
-        print(f"Loading {self.url}")
+        # The expensive part runs once per page; later calls return the loaded content
+        if self.content is None:
+            start = time.perf_counter()
+            print(f"Loading {self.url}")
+            self.content = f"<html><body>{self.url}</body></html>"
+            self.metrics.record(time.perf_counter() - start)
+        return self.content
 
 
 class ProxyWebPage(WebPage):
-    def __init__(self, url):
+    """
+    Virtual proxy: the RealWebPage is created on first access. Double-checked locking makes sure that concurrent
+    first accesses still create it only once.
+    """
+
+    def __init__(self, url, prefetcher=None):
         self.url = url
         self.real_web_page = None
+        self.prefetcher = prefetcher
+        self._lock = threading.Lock()
 
-    def load(self):
+    def get_real_web_page(self):
         if self.real_web_page is None:
-            self.real_web_page = RealWebPage(self.url)
-        self.real_web_page.load()
+            with self._lock:
+                if self.real_web_page is None:
+                    self.real_web_page = RealWebPage(self.url)
+        return self.real_web_page
+
+    def load(self):
+        content = self.get_real_web_page().load()
+        if self.prefetcher is not None:
+            self.prefetcher.visited(self.url)
+        return content
+
+
+class PagePrefetcher:
+    """
+    Learns which page tends to follow which from the visit history, and after each visit loads the most likely next
+    pages in a bounded background thread pool.
+    """
+
+    def __init__(self, max_workers=4, predictions=2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        self.predictions = predictions
+        self.pages: Dict[str, ProxyWebPage] = {}
+        self.transitions: Dict[str, Counter] = defaultdict(Counter)
+        self.last_url = None
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def get_page(self, url):
+        with self.lock:
+            page = self.pages.get(url)
+            if page is None:
+                page = self.pages[url] = ProxyWebPage(url, self)
+            return page
+
+    def hint(self, url, next_urls):
+        # Seeds the predictions, e.g. with the links found on a page
+        with self.lock:
+            self.transitions[url].update(next_urls)
+
+    def visited(self, url):
+        with self.lock:
+            if self.last_url is not None and self.last_url != url:
+                self.transitions[self.last_url][url] += 1
+            self.last_url = url
+            if self.closed:
+                return
+            # Submitted under the lock, so shutdown() cannot close the executor between the check and the submit
+            for next_url, _ in self.transitions[url].most_common(self.predictions):
+                page = self.pages.get(next_url)
+                if page is None:
+                    page = self.pages[next_url] = ProxyWebPage(next_url, self)
+                self.executor.submit(page.get_real_web_page)
+
+    def shutdown(self):
+        with self.lock:
+            self.closed = True
+        self.executor.shutdown(wait=True)
 
 
 if __name__ == '__main__':
@@ -47,6 +144,24 @@ if __name__ == '__main__':
     web_page = ProxyWebPage(url)
     web_page.load()
     web_page.load()
+    print(RealWebPage.metrics.snapshot())
+
+    # Concurrent first access still loads the page once
+    shared_page = ProxyWebPage("https://www.python.org")
+    threads = [threading.Thread(target=shared_page.load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(RealWebPage.metrics.snapshot())
+
+    # Likely next pages are loaded in the background, so visiting them later costs nothing
+    prefetcher = PagePrefetcher()
+    prefetcher.hint("https://news.example.com", ["https://news.example.com/top", "https://news.example.com/world"])
+    prefetcher.get_page("https://news.example.com").load()
+    prefetcher.shutdown()
+    prefetcher.get_page("https://news.example.com/top").load()
+    print(RealWebPage.metrics.snapshot())
 
 """
 Another example of the Proxy Design Pattern is the Django ORM. When you query a model, Django does not immediately
@@ -62,30 +177,502 @@ class FetchAPI(ABC):
         pass
 
 
+class FetchResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        # Decoded on every call: the response is shared by all callers of a cached URL, and a shared decoded object
+        # would let one caller's mutation leak into everyone else's result
+        return json.loads(self.body)
+
+
+class FetchBackend(ABC):
+    def __init__(self, timeout=10.0):
+        self.timeout = timeout
+
+    @abstractmethod
+    def fetch_response(self, url, headers=None):
+        pass
+
+    async def fetch_many(self, urls, concurrency=10):
+        # Yields (url, response or exception) pairs as they complete, with at most `concurrency` requests in flight
+        import asyncio
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_one(url):
+            async with semaphore:
+                try:
+                    return url, await asyncio.wait_for(asyncio.to_thread(self.fetch_response, url), self.timeout)
+                except Exception as error:
+                    return url, error
+
+        for next_done in asyncio.as_completed([fetch_one(url) for url in urls]):
+            yield await next_done
+
+
+class PooledFetchBackend(FetchBackend):
+    """Keeps one requests session whose keep-alive connections are reused across fetches."""
+
+    def __init__(self, pool_size=10, timeout=10.0):
+        # requests (and urllib3) are imported on first use so that importing this module stays cheap
+        import requests
+        import requests.adapters
+
+        super().__init__(timeout)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch_response(self, url, headers=None):
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        return FetchResponse(response.status_code, dict(response.headers), response.content)
+
+
+class UrllibFetchBackend(FetchBackend):
+    """Standard library backend, used when requests is not installed."""
+
+    def fetch_response(self, url, headers=None):
+        import urllib.error
+        import urllib.request
+
+        request = urllib.request.Request(url, headers=headers or {})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return FetchResponse(response.status, dict(response.headers), response.read())
+        except urllib.error.HTTPError as error:
+            # urllib raises for 304 Not Modified and error statuses alike
+            return FetchResponse(error.code, dict(error.headers), error.read())
+
+
+class FakeFetchBackend(FetchBackend):
+    """In-memory backend for tests and demos: serves canned bodies and counts the calls."""
+
+    def __init__(self, responses, timeout=10.0):
+        super().__init__(timeout)
+        self.responses = responses
+        self.calls = 0
+
+    def fetch_response(self, url, headers=None):
+        self.calls += 1
+        if url not in self.responses:
+            return FetchResponse(404, {}, b'')
+        return FetchResponse(200, {}, self.responses[url])
+
+
+_default_backend = None
+
+
+def get_default_backend():
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = PooledFetchBackend() if find_spec('requests') else UrllibFetchBackend()
+    return _default_backend
+
+
+def set_default_backend(backend):
+    global _default_backend
+    _default_backend = backend
+
+
 class RealFetchAPI(FetchAPI):
-    def __init__(self, url):
+    def __init__(self, url, backend=None):
         self.url = url
+        self.backend = backend or get_default_backend()
 
     def fetch(self):
+        return self.fetch_response().json()
+
+    def fetch_response(self, headers=None):
         print(f"Fetching {self.url}")
-        response = requests.get(self.url)
-        return response.json()
+        return self.backend.fetch_response(self.url, headers)
+
+
+class CacheEntry:
+    def __init__(self, response, stored_at):
+        self.response = response
+        self.stored_at = stored_at
+        self.size = len(response.body)
+
+
+class DiskCache:
+    """
+    Persistent tier under ResponseCache, one file per URL. Files are flushed to disk under a temporary name and renamed
+    into place, so a reader never sees a half-written entry; an entry that is unreadable anyway (e.g. after a crash)
+    is deleted and treated as a miss. Each read loads the file into memory, so no file handle outlives the call.
+    An in-memory index ordered by last read decides which files to delete once the directory grows past max_bytes.
+    Several processes may share the directory: every rescan_every writes the index is rebuilt from a directory scan
+    (ordered by modification time, which reads also bump), so files written by other workers count towards the budget.
+    Between scans the directory can run over by up to rescan_every writes from each of the other workers.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, rescan_every=256):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rescan_every = rescan_every
+        self.lock = threading.Lock()
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.entry'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        entries.sort()
+        self.index: OrderedDict[str, int] = OrderedDict((path, size) for _, path, size in entries)
+        self.total_bytes = sum(self.index.values())
+        self.writes_since_scan = 0
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + '.entry')
+
+    def _discard(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        self.total_bytes -= self.index.pop(path, 0)
+
+    def get(self, url):
+        path = self._path(url)
+        try:
+            with open(path, 'rb') as entry_file:
+                data = entry_file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        try:
+            header_end = data.index(b'\n')
+            metadata = json.loads(data[:header_end])
+            response = FetchResponse(metadata['status'], metadata['headers'], data[header_end + 1:])
+            entry = CacheEntry(response, metadata['stored_at'])
+        except (ValueError, KeyError, TypeError):
+            # Empty or truncated file: drop it so the URL is fetched again
+            with self.lock:
+                self._discard(path)
+            return None
+        with self.lock:
+            if path in self.index:
+                self.index.move_to_end(path)
+        return entry
+
+    def put(self, url, response, stored_at):
+        header = json.dumps({'status': response.status, 'headers': response.headers, 'stored_at': stored_at})
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as entry_file:
+            entry_file.write(header.encode() + b'\n')
+            entry_file.write(response.body)
+            entry_file.flush()
+            os.fsync(entry_file.fileno())
+        path = self._path(url)
+        new_size = os.path.getsize(temp_path)
+        with self.lock:
+            os.replace(temp_path, path)
+            self.writes_since_scan += 1
+            if self.writes_since_scan >= self.rescan_every:
+                self._scan()
+            else:
+                self.total_bytes += new_size - self.index.pop(path, 0)
+                self.index[path] = new_size
+            self._evict()
+
+    def _evict(self):
+        # Least recently read first; the entry just written is last in the index
+        while self.total_bytes > self.max_bytes and len(self.index) > 1:
+            self._discard(next(iter(self.index)))
+
+
+class ResponseCache:
+    """
+    Response cache shared by every ProxyFetchAPI for the same URL. Entries are fresh for ttl seconds. After that they
+    are served stale for up to stale_ttl more seconds while a background revalidation runs. Revalidation sends
+    If-None-Match / If-Modified-Since, so an unchanged response only costs a 304. Concurrent misses for one URL are
+    collapsed into a single in-flight fetch, and the least recently used entries are evicted once max_bytes is
+    exceeded. A failed fetch (an exception or a 5xx) keeps the previous entry and serves it. With a DiskCache, memory
+    misses fall through to disk and every stored response is also written there, so the cache survives restarts.
+    """
+
+    def __init__(self, ttl=60.0, stale_ttl=300.0, max_bytes=64 * 1024 * 1024, disk_cache=None):
+        self.disk_cache = disk_cache
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.total_bytes = 0
+        self.in_flight: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def _insert(self, url, entry):
+        old_entry = self.entries.pop(url, None)
+        if old_entry is not None:
+            self.total_bytes -= old_entry.size
+        self.entries[url] = entry
+        self.total_bytes += entry.size
+        while self.total_bytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+
+    def get(self, url, fetch_response):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(url)
+        # The disk read happens outside the lock so a slow disk does not stall hits on other URLs
+        disk_entry = self.disk_cache.get(url) if entry is None and self.disk_cache is not None else None
+        with self.lock:
+            if disk_entry is not None:
+                self.disk_hits += 1
+                # Another thread may have stored a newer response while the disk was being read
+                entry = self.entries.get(url)
+                if entry is None:
+                    entry = disk_entry
+                    self._insert(url, entry)
+            if entry is not None and now - entry.stored_at < self.ttl:
+                self.hits += 1
+                self.entries.move_to_end(url)
+                return entry.response
+            if entry is not None and now - entry.stored_at < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self.entries.move_to_end(url)
+                if url not in self.in_flight:
+                    future = self.in_flight[url] = Future()
+                    threading.Thread(target=self._fetch, args=(url, fetch_response, entry, future),
+                                     daemon=True).start()
+                return entry.response
+
+            future = self.in_flight.get(url)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = self.in_flight[url] = Future()
+
+        if leader:
+            self._fetch(url, fetch_response, entry, future)
+        return future.result()
+
+    def _fetch(self, url, fetch_response, entry, future):
+        try:
+            headers = {}
+            if entry is not None:
+                if 'ETag' in entry.response.headers:
+                    headers['If-None-Match'] = entry.response.headers['ETag']
+                if 'Last-Modified' in entry.response.headers:
+                    headers['If-Modified-Since'] = entry.response.headers['Last-Modified']
+            response = fetch_response(headers=headers or None)
+            if response.status == 304 and entry is not None:
+                self.revalidations += 1
+                response = entry.response
+            elif response.status >= 500 and entry is not None:
+                # Server error: keep the cached entry and serve it rather than the error
+                future.set_result(entry.response)
+                return
+            self._store(url, response)
+            future.set_result(response)
+        except Exception as error:
+            if entry is not None:
+                future.set_result(entry.response)
+            else:
+                future.set_exception(error)
+        finally:
+            with self.lock:
+                self.in_flight.pop(url, None)
+
+    def _store(self, url, response):
+        stored_at = time.time()
+        with self.lock:
+            if response.status != 200:
+                old_entry = self.entries.pop(url, None)
+                if old_entry is not None:
+                    self.total_bytes -= old_entry.size
+                return
+            self._insert(url, CacheEntry(response, stored_at))
+        if self.disk_cache is not None:
+            self.disk_cache.put(url, response, stored_at)
+
+    def metrics(self):
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'entries': len(self.entries),
+            'bytes': self.total_bytes,
+        }
 
 
 class ProxyFetchAPI(FetchAPI):
-    def __init__(self, url):
+    shared_cache = ResponseCache()
+
+    def __init__(self, url, cache=None):
         self.url = url
-        self.api_content = None
+        self.cache = cache or self.shared_cache
 
     def fetch(self):
-        if self.api_content is None:
-            real_fetch_api = RealFetchAPI(self.url)
-            self.api_content = real_fetch_api.fetch()
-        return self.api_content
+        return self.cache.get(self.url, RealFetchAPI(self.url).fetch_response).json()
+
+
+def start_local_api_server(payload=None, latency=0.0):
+    """
+    Serves a JSON payload with an ETag on localhost, answering conditional requests with 304. The returned server
+    records the status of every response in server.statuses, and setting server.fail_status makes it answer every
+    request with that status instead.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    body = json.dumps(payload or {'page': 2, 'data': [{'id': 7, 'email': 'michael.lawson@reqres.in'}]}).encode()
+    etag = '"%x"' % hash(body)
+
+    class LocalAPIHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.server.fail_status is not None:
+                self.server.statuses.append(self.server.fail_status)
+                self.send_response(self.server.fail_status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.server.statuses.append(304 if self.headers.get('If-None-Match') == etag else 200)
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), LocalAPIHandler)
+    server.statuses = []
+    server.fail_status = None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/api/users?page=2'
+
+
+def benchmark_fetch_backends(request_count=200, latency=0.01):
+    import asyncio
+
+    server, url = start_local_api_server(latency=latency)
+    urls = [url] * request_count
+    # requests is optional: without it only the standard library backend is measured
+    if find_spec('requests'):
+        import requests
+
+        backend = PooledFetchBackend(pool_size=20)
+    else:
+        print('requests is not installed, skipping the pooled session')
+        backend = UrllibFetchBackend()
+
+    async def fetch_all():
+        async for _ in backend.fetch_many(urls, concurrency=20):
+            pass
+
+    timings = {}
+    start = time.perf_counter()
+    for target in urls:
+        if isinstance(backend, PooledFetchBackend):
+            requests.get(target).content
+        else:
+            backend.fetch_response(target)
+    timings['sequential, new connection each'] = time.perf_counter() - start
+
+    if isinstance(backend, PooledFetchBackend):
+        start = time.perf_counter()
+        for target in urls:
+            backend.fetch_response(target)
+        timings['sequential, pooled session'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    asyncio.run(fetch_all())
+    timings['async fetch_many, 20 in flight'] = time.perf_counter() - start
+    server.shutdown()
+
+    for name, elapsed in timings.items():
+        print(f'{name}: {request_count / elapsed:.0f} requests/s')
+
+
+def benchmark_import_time(runs=5, budget=0.05):
+    """Imports this module in fresh interpreters and checks that requests is not loaded by the import."""
+    import subprocess
+
+    script = ('import sys, time; start = time.perf_counter(); import proxy; '
+              'print(time.perf_counter() - start, "requests" in sys.modules)')
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout.split()
+        timings.append(float(output[0]))
+        if output[1] == 'True':
+            raise RuntimeError('Importing proxy loaded requests')
+    best = min(timings)
+    print(f'import proxy: best of {runs} {best * 1000:.1f} ms (budget {budget * 1000:.0f} ms)')
+    if best > budget:
+        raise RuntimeError(f'Import time regression: {best * 1000:.1f} ms')
+
+
+def benchmark_disk_warmup(url_count=10_000, body_size=2048):
+    urls = [f'https://example.com/api/items/{index}' for index in range(url_count)]
+    backend = FakeFetchBackend({url: b'{"data": "%s"}' % (b'x' * body_size) for url in urls})
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(disk_cache=DiskCache(directory))
+        for url in urls:
+            cache.get(url, lambda headers=None, url=url: backend.fetch_response(url, headers))
+
+        # A new process would start with an empty memory tier and the same directory
+        restarted = ResponseCache(disk_cache=DiskCache(directory))
+        calls_before = backend.calls
+        start = time.perf_counter()
+        for url in urls:
+            restarted.get(url, lambda headers=None, url=url: backend.fetch_response(url, headers))
+        elapsed = time.perf_counter() - start
+        refetched = backend.calls - calls_before
+
+    print(f'Warmed {url_count} entries from disk in {elapsed:.3f}s after restart, '
+          f'hit rate {(url_count - refetched) / url_count:.1%}')
 
 
 if __name__ == '__main__':
-    url = "https://reqres.in/api/users?page=2"
+    server, url = start_local_api_server()
     fetch_api = ProxyFetchAPI(url)
     print(fetch_api.fetch())
-    print(fetch_api.fetch())
+    print(ProxyFetchAPI(url).fetch())
+
+    # Expired entries are revalidated with the ETag and the server answers 304
+    ProxyFetchAPI.shared_cache.ttl = 0
+    ProxyFetchAPI.shared_cache.stale_ttl = 0
+    print(ProxyFetchAPI(url).fetch())
+    print(ProxyFetchAPI.shared_cache.metrics())
+    print(RealFetchAPI(url, UrllibFetchBackend()).fetch())
+    server.shutdown()
+
+    fake_backend = FakeFetchBackend({'https://example.com/api': b'{"fake": true}'})
+    print(RealFetchAPI('https://example.com/api', fake_backend).fetch(), fake_backend.calls)
+
+    if '--benchmark' in sys.argv:
+        benchmark_fetch_backends()
+        benchmark_import_time()
+        benchmark_disk_warmup()
@@ -0,0 +1,83 @@
+"""
+ResponseCache behaviour against the local http.server stand-in from structural_patterns/proxy.py: ETag revalidation,
+collapsing of concurrent misses, serving stale entries when the server fails and isolation of decoded results.
+"""
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'structural_patterns'))
+
+from proxy import ProxyFetchAPI, RealFetchAPI, ResponseCache, UrllibFetchBackend, start_local_api_server  # noqa: E402
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.server, self.url = start_local_api_server(latency=0.05)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        real_api = RealFetchAPI(self.url, UrllibFetchBackend())
+
+        def fetch_response(headers=None):
+            # RealFetchAPI logs every network fetch
+            with contextlib.redirect_stdout(io.StringIO()):
+                return real_api.fetch_response(headers)
+
+        self.fetch_response = fetch_response
+
+    def wait_for_revalidation(self, cache):
+        deadline = time.time() + 5
+        while cache.in_flight and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_expired_entry_is_revalidated_with_304(self):
+        cache = ResponseCache(ttl=0, stale_ttl=0)
+        first = cache.get(self.url, self.fetch_response)
+        second = cache.get(self.url, self.fetch_response)
+
+        self.assertEqual(self.server.statuses, [200, 304])
+        self.assertEqual(cache.revalidations, 1)
+        self.assertEqual(second.json(), first.json())
+
+    def test_concurrent_misses_share_one_fetch(self):
+        cache = ResponseCache()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get(self.url, self.fetch_response)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.server.statuses, [200])
+        self.assertEqual(len(results), 8)
+        self.assertEqual(cache.misses, 1)
+
+    def test_stale_entry_survives_server_errors(self):
+        cache = ResponseCache(ttl=0, stale_ttl=60)
+        expected = cache.get(self.url, self.fetch_response).json()
+
+        self.server.fail_status = 503
+        self.assertEqual(cache.get(self.url, self.fetch_response).json(), expected)
+        self.wait_for_revalidation(cache)
+
+        self.assertEqual(self.server.statuses, [200, 503])
+        self.assertIn(self.url, cache.entries)
+        self.assertEqual(cache.get(self.url, self.fetch_response).json(), expected)
+
+    def test_callers_get_independent_decoded_values(self):
+        cache = ResponseCache()
+        first = ProxyFetchAPI(self.url, cache)
+        first.cache.get(self.url, self.fetch_response)
+        result = first.fetch()
+        result['data'].append('mutated')
+
+        self.assertNotIn('mutated', ProxyFetchAPI(self.url, cache).fetch()['data'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+Startup-cost checks: every module of the project must import in a fresh interpreter without printing anything and
+within a wall-time budget. Modules import their siblings by bare name, so each one is imported from its own directory.
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGES = ('behavioral_patterns', 'case_study', 'creational_patterns', 'solid', 'structural_patterns')
+IMPORT_BUDGET_SECONDS = 0.25
+
+IMPORT_SCRIPT = '''
+import io, sys, time
+captured = io.StringIO()
+sys.stdout = captured
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+sys.stdout = sys.__stdout__
+print(elapsed)
+print(repr(captured.getvalue()))
+'''
+
+
+def project_modules():
+    for package in PACKAGES:
+        directory = os.path.join(ROOT, package)
+        for file_name in sorted(os.listdir(directory)):
+            if file_name.endswith('.py') and file_name != '__init__.py':
+                yield directory, file_name[:-3]
+
+
+class StartupCostTest(unittest.TestCase):
+    def test_modules_import_quietly_within_budget(self):
+        for directory, module in project_modules():
+            with self.subTest(module=f'{os.path.basename(directory)}.{module}'):
+                result = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT.format(module=module)], cwd=directory,
+                                        capture_output=True, text=True, timeout=60)
+                self.assertEqual(result.returncode, 0, result.stderr)
+                elapsed, captured = result.stdout.splitlines()
+                self.assertEqual(captured, "''", f'{module} printed on import')
+                self.assertLess(float(elapsed), IMPORT_BUDGET_SECONDS, f'{module} is slow to import')
+
+
+if __name__ == '__main__':
+    unittest.main()